@@ -1,8 +1,7 @@
 # -*- coding: utf-8 -*-
 import os
-import sys
-import subprocess
 import threading
+import time
 
 
 import inspect
@@ -10,6 +9,8 @@ import importlib.util
 
 from test import Test
 from graphsDef import Graph
+from jythonWorker import JythonWorker
+from templateMatcher import NumpyTemplateMatcher
 
 import graphIO as _graph_io_module
 GraphIO = _graph_io_module.GraphIO
@@ -54,6 +55,12 @@ class App():
         self.sikuli_script = sikuli_script                              # Path to Sikuli script
 
         self.jython_thread = None                                       # Jython thread
+        self.jython_worker = None                                       # Long-lived Jython process
+        self.progress = None                                            # Counters of the running graph generation
+        try:
+            self.template_matcher = NumpyTemplateMatcher()              # Screen matcher of match_screen
+        except ImportError:
+            self.template_matcher = None                                # Without numpy the Jython worker matches
             
         self.graph_io = GraphIO()                                       # GraphIO instance
         self.graph = Graph()                                            # Theorical graph
@@ -190,54 +197,158 @@ class App():
         pass 
         
     """
-        Run the Jython script to generate the graph
+        Run the Jython script to generate the graph.
+        The script runs in a long-lived Jython process, so only the first generation starts the JVM.
     """
     def run_jython(self):
         def execute_command():
             try:
-                command = [
-                    self.java_path,
-                    "-cp",
-                    self.sikulix_jar,
-                    "org.python.util.jython",
-                    self.sikuli_script,
-                    "--images_dir", self.images_dir,
-                    "--practical_graph_file", self.practical_graph_file,
-                    "--selected_executable", self.selected_executable,
-                    "--executable_delay", str(self.executable_delay),
-                    "--transition_delay", str(self.transition_delay),
-                ]
-                if self.debug_images:
-                    command.append("--debug_images")
-                command += [
-                    "--timeout", str(self.timeout),
-                    "--initial_similarity", str(self.initial_similarity),
-                    "--min_similarity", str(self.min_similarity),
-                    "--similarity_step", str(self.similarity_step),
-                    "--retries", str(self.retries),
-                    "--state_reset_method", str(self.state_reset_method),
-                    "--external_reset_script", str(self.external_reset_script),
-                ]
-                print("[INFO] Running Jython script: " + " ".join(command))
-                process = subprocess.Popen(
-                    command,
-                    stdout=sys.__stdout__,
-                    stderr=sys.__stderr__,
-                    text=True,
-                    shell=True
-                )
-                self.jython_process = process
-                process.wait()  # Espera solo dentro del subhilo, no bloquea la GUI
+                self.reset_progress()
+                result = self.get_jython_worker().request("generate", options=self.get_generation_options())
+                if result.get("error"):
+                    print("[ERROR] Failed to run Jython script: " + result["error"])
                 print("[INFO] Jython script finished.")
             except Exception as e:
                 print("[ERROR] Failed to run Jython script: " + str(e))
-            finally:
-                self.jython_process = None
 
         self.jython_thread = threading.Thread(target=execute_command, daemon=True)
         self.jython_thread.start()
         return True
 
+    """
+        Returns the Jython worker, starting a new one if the Java, SikuliX or script paths changed
+    """
+    def get_jython_worker(self):
+        command = [
+            self.java_path,
+            "-cp",
+            self.sikulix_jar,
+            "org.python.util.jython",
+            self.sikuli_script,
+            "--serve",
+            "--images_dir", self.images_dir,
+            "--practical_graph_file", self.practical_graph_file,
+            "--selected_executable", self.selected_executable,
+        ]
+        if self.jython_worker is None or self.jython_worker.command[:5] != command[:5]:
+            if self.jython_worker is not None:
+                self.jython_worker.stop()
+            self.jython_worker = JythonWorker(command, self.handle_exploration_event)
+        return self.jython_worker
+
+    """
+        Returns the current settings as options of the graph generation
+    """
+    def get_generation_options(self):
+        return {
+            "images_dir": self.images_dir,
+            "practical_graph_file": self.practical_graph_file,
+            "selected_executable": self.selected_executable,
+            "executable_delay": self.executable_delay,
+            "transition_delay": self.transition_delay,
+            "debug_images": bool(self.debug_images),
+            "timeout": self.timeout,
+            "initial_similarity": self.initial_similarity,
+            "min_similarity": self.min_similarity,
+            "similarity_step": self.similarity_step,
+            "retries": self.retries,
+            "state_reset_method": str(self.state_reset_method),
+            "external_reset_script": self.external_reset_script,
+            "events": True,
+        }
+
+    """
+        Reset the counters of the graph generation
+    """
+    def reset_progress(self):
+        self.progress = {
+            "start_time": time.time(),
+            "nodes": 0,
+            "transitions": 0,
+            "replays": 0,
+            "matches": 0,
+            "match_seconds": 0.0,
+        }
+
+    """
+        Update the counters with a progress event of the graph generation.
+        Called from the thread that reads the output of the Jython process.
+
+        Args:
+            event (dict): Event with its type in the event key
+    """
+    def handle_exploration_event(self, event):
+        if self.progress is None:
+            self.reset_progress()
+        kind = event.get("event")
+        if kind == "node":
+            self.progress["nodes"] += 1
+        elif kind == "transition":
+            self.progress["transitions"] += 1
+        elif kind == "replay":
+            self.progress["replays"] += 1
+        elif kind == "match":
+            self.progress["matches"] += 1
+            self.progress["match_seconds"] += event.get("seconds", 0.0)
+        self.on_exploration_event(event)
+
+    """
+        Base for the children to show a progress event of the graph generation
+    """
+    def on_exploration_event(self, event):
+        pass
+
+    """
+        Returns the throughput of the running graph generation:
+        nodes and transitions per minute, matches per second and average match latency in seconds
+    """
+    def get_throughput(self):
+        if self.progress is None:
+            return None
+        minutes = max(time.time() - self.progress["start_time"], 1e-6) / 60.0
+        matches = self.progress["matches"]
+        return {
+            "nodes_per_minute": self.progress["nodes"] / minutes,
+            "transitions_per_minute": self.progress["transitions"] / minutes,
+            "matches_per_second": matches / (minutes * 60.0),
+            "average_match_latency": self.progress["match_seconds"] / matches if matches else 0.0,
+        }
+
+    """
+        Returns a one line summary of the progress of the graph generation
+    """
+    def get_progress_summary(self):
+        throughput = self.get_throughput()
+        if throughput is None:
+            return "No graph generation running"
+        return ("Nodes: " + str(self.progress["nodes"]) +
+                ", transitions: " + str(self.progress["transitions"]) +
+                ", replays: " + str(self.progress["replays"]) +
+                " | " + format(throughput["nodes_per_minute"], ".1f") + " nodes/min, " +
+                format(throughput["transitions_per_minute"], ".1f") + " transitions/min, " +
+                format(throughput["average_match_latency"] * 1000, ".0f") + " ms per match")
+
+    """
+        Returns (image, score) of the image that best matches the screen among image_paths,
+        (None, 0) if none reaches the minimum similarity.
+        The screen is captured once and searched coarse to fine with NumpyTemplateMatcher when numpy
+        and Pillow are installed, otherwise the match request of the Jython worker searches it with SikuliX.
+
+        Args:
+            image_paths (list): Paths of the images to compare with the screen
+    """
+    def match_screen(self, image_paths):
+        if self.template_matcher is not None:
+            image, match = self.template_matcher.best_match(self.template_matcher.capture(), image_paths, self.min_similarity)
+            if match is None:
+                return None, 0
+            return image, match.score
+        result = self.get_jython_worker().request("match", images=image_paths, options=self.get_generation_options())
+        if result.get("error"):
+            print("[ERROR] Failed to match the screen: " + result["error"])
+            return None, 0
+        return result.get("image"), result.get("score", 0)
+
     """
         Execute the selected tests
     """
@@ -306,26 +417,29 @@ class App():
                 differences_found += 1
                 continue
 
+            # Group the transitions of node2 by image so each transition of node1 only visits its matches
+            transitions_by_image = {}
+            for trans2 in node2.transitions:
+                transitions_by_image.setdefault(trans2.image, []).append(trans2)
+
             for trans1 in node1.transitions:
                 dest_image = trans1.destination.image
                 found = False
                 
-                for trans2 in node2.transitions:
-                    print("[INFO] Comparing transition: " + trans1.image)
-                    if trans2.image == trans1.image:
-                        print("[INFO] Transition found: " + trans1.image)
-                        if trans2.destination.image != dest_image:
-                            print("[INFO] Transition mismatch: " + trans1.image)
-                            # Writes the objetive destination and the real destination
-                            file_output.write("[MISMATCH TRANSITION] Supposed: " + node1.name + " -/-> " + trans1.destination.name + " Real: " + node1.name +" -> " + trans2.destination.name + "\n")
-                            self.diff['mismatch_trans'].append((node1.name, trans1.destination.name, trans2.destination.name, f"{graph1.name} vs {graph2.name}"))   
-                            if diff_in == "diff_in_gen":
-                                self.diff['missing_edges_the'].add((node1.name, trans1.destination.name))                         
-                            else:
-                                self.diff['missing_edges_gen'].add((node1.name, trans1.destination.name))
-                            differences_found += 1
-                        found = True
-                        continue
+                print("[INFO] Comparing transition: " + trans1.image)
+                for trans2 in transitions_by_image.get(trans1.image, ()):
+                    print("[INFO] Transition found: " + trans1.image)
+                    if trans2.destination.image != dest_image:
+                        print("[INFO] Transition mismatch: " + trans1.image)
+                        # Writes the objetive destination and the real destination
+                        file_output.write("[MISMATCH TRANSITION] Supposed: " + node1.name + " -/-> " + trans1.destination.name + " Real: " + node1.name +" -> " + trans2.destination.name + "\n")
+                        self.diff['mismatch_trans'].append((node1.name, trans1.destination.name, trans2.destination.name, f"{graph1.name} vs {graph2.name}"))   
+                        if diff_in == "diff_in_gen":
+                            self.diff['missing_edges_the'].add((node1.name, trans1.destination.name))                         
+                        else:
+                            self.diff['missing_edges_gen'].add((node1.name, trans1.destination.name))
+                        differences_found += 1
+                    found = True
                 if not found:
                     print("[INFO] Transition not found: " + trans1.image)
                     file_output.write("[MISSING TRANSITION] " + node1.name + " -/-> " + trans1.destination.name + " " + trans1.image + "\n")
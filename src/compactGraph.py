@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+from array import array
+from graphsDef import Graph, intern_string
+
+NO_VALUE = -1
+
+"""
+    Class CompactGraph stores a Graph as flat integer arrays (struct of arrays).
+    Nodes are identified by their position and every string (names, image paths,
+    actions and texts) is stored once in a shared string table.
+    The edges of a node are contiguous: the edges of node i go from
+    edge_offsets[i] to edge_offsets[i + 1].
+
+    Attributes:
+        strings (list): String table
+        node_names (array): String id of the name of each node
+        node_images (array): String id of the image of each node, NO_VALUE if it has none
+        edge_offsets (array): Index of the first edge of each node, plus the total edge count
+        edge_destinations (array): Destination node id of each edge
+        edge_actions (array): String id of the action of each edge
+        edge_images (array): String id of the image of each edge
+        edge_texts (array): String id of the text of each edge
+        edge_drag_images (array): String id of the drag image of each edge
+        edge_drop_images (array): String id of the drop image of each edge
+        start_node (int): Id of the start node, NO_VALUE if the graph has none
+"""
+class CompactGraph:
+    def __init__(self):
+        self.strings = []
+        self._string_ids = {}
+        self._node_ids = {}
+
+        self.node_names = array('i')
+        self.node_images = array('i')
+
+        self.edge_offsets = array('i', [0])
+        self.edge_destinations = array('i')
+        self.edge_actions = array('i')
+        self.edge_images = array('i')
+        self.edge_texts = array('i')
+        self.edge_drag_images = array('i')
+        self.edge_drop_images = array('i')
+
+        self.start_node = NO_VALUE
+
+    """
+        Builds a CompactGraph from a Graph
+    """
+    @classmethod
+    def from_graph(cls, graph):
+        compact = cls()
+        nodes = list(graph.nodes)
+        node_ids = {}
+        for node in nodes:
+            node_ids[node] = compact._add_node(node.name, node.image)
+
+        for node in nodes:
+            for t in node.transitions:
+                compact.edge_destinations.append(node_ids[t.destination])
+                compact.edge_actions.append(compact._string_id(t.action))
+                compact.edge_images.append(compact._string_id(t.image))
+                compact.edge_texts.append(compact._string_id(t.text))
+                compact.edge_drag_images.append(compact._string_id(t.drag_image))
+                compact.edge_drop_images.append(compact._string_id(t.drop_image))
+            compact.edge_offsets.append(len(compact.edge_destinations))
+
+        if graph.startNode is not None and graph.startNode in node_ids:
+            compact.start_node = node_ids[graph.startNode]
+        return compact
+
+    """
+        Rebuilds a Graph with Node and Transition objects from this CompactGraph
+    """
+    def to_graph(self):
+        graph = Graph()
+        nodes = []
+        for node_id in range(self.node_count()):
+            node = graph.add_node(self.get_node_name(node_id))
+            image = self._string(self.node_images[node_id])
+            if image is not None:
+                # The image was already validated when the original graph was built
+                node.image = image
+                graph.update_node_image_index(node, None)
+            nodes.append(node)
+
+        for node_id, node in enumerate(nodes):
+            for edge_id in range(self.edge_offsets[node_id], self.edge_offsets[node_id + 1]):
+                t = graph.add_transition(node, nodes[self.edge_destinations[edge_id]])
+                t.update_action(self._string(self.edge_actions[edge_id]))
+                t.update_image(self._string(self.edge_images[edge_id]))
+                t.update_text(self._string(self.edge_texts[edge_id]))
+                t.update_drag_and_drop(self._string(self.edge_drag_images[edge_id]), self._string(self.edge_drop_images[edge_id]))
+
+        if self.start_node != NO_VALUE:
+            graph.set_start_node(nodes[self.start_node])
+        return graph
+
+    def node_count(self):
+        return len(self.node_names)
+
+    def edge_count(self):
+        return len(self.edge_destinations)
+
+    """
+        Returns the id of the node with the given name, None if it does not exist
+    """
+    def get_node_id(self, name):
+        return self._node_ids.get(name)
+
+    def get_node_name(self, node_id):
+        return self.strings[self.node_names[node_id]]
+
+    def get_node_image(self, node_id):
+        return self._string(self.node_images[node_id])
+
+    """
+        Returns the ids of the destination nodes of the edges of a node
+    """
+    def successors(self, node_id):
+        return self.edge_destinations[self.edge_offsets[node_id]:self.edge_offsets[node_id + 1]]
+
+    def _add_node(self, name, image):
+        node_id = len(self.node_names)
+        self.node_names.append(self._string_id(name))
+        self.node_images.append(self._string_id(image))
+        self._node_ids[name] = node_id
+        return node_id
+
+    def _string_id(self, value):
+        if value is None:
+            return NO_VALUE
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(intern_string(value))
+            self._string_ids[value] = string_id
+        return string_id
+
+    def _string(self, string_id):
+        if string_id == NO_VALUE:
+            return None
+        return self.strings[string_id]
@@ -1,7 +1,5 @@
 from app import App
 
-import time
-
 """
     Console class for running the application in a headless mode.
 """
@@ -58,12 +56,19 @@ class Console(App):
             self.test_classes = self.get_test_classes()
             if generate_graph:
                 if self.generate_graph_from_executable():
-                    while self.jython_thread.is_alive():
-                        time.sleep(0.1)
+                    self.jython_thread.join()
+                    print("[PROGRESS] " + self.get_progress_summary())
             self.run_tests()
             self.compare()
             self.create_PDF(self.pdf_file)     
         
+    """
+        Print the progress when a node or a transition is found
+    """
+    def on_exploration_event(self, event):
+        if event.get("event") in ("node", "transition"):
+            print("[PROGRESS] " + self.get_progress_summary())
+
     """
         Returns the selected test classes for run the test.
     """   
@@ -1,22 +1,28 @@
 # -*- coding: utf-8 -*-
 import argparse
+import json
 import os
+import sys
 import subprocess
 import shutil
 import threading
 import time
 import re
+from collections import deque
 from sikulixWrapper import SikulixWrapper
 from graphsDef import Graph
 from actionTypes import ActionType
 from stateResetMethod import StateResetMethod
+from imageCatalog import ImageCatalog
 import graphIO as _graph_io_module
 GraphIO = _graph_io_module.GraphIO
+replace_file = _graph_io_module.replace_file
+from parallelExplorer import ParallelExplorer, WORKER_RESULT_PREFIX, EVENT_PREFIX
 
 class GenerateGraph:
     valid_extensions = {'.png', '.jpg', '.jpeg', '.bmp'}
 
-    def __init__(self, images_dir=None, practical_graph_file=None, selected_executable=None, executable_delay=5, transition_delay=1, debug_images=False, timeout=2, initial_similarity=0.99, min_similarity=0.85, similarity_step=0.01, retries=8, state_reset_method=StateResetMethod.NONE, external_reset_script=None):
+    def __init__(self, images_dir=None, practical_graph_file=None, selected_executable=None, executable_delay=5, transition_delay=1, debug_images=False, timeout=2, initial_similarity=0.99, min_similarity=0.85, similarity_step=0.01, retries=8, state_reset_method=StateResetMethod.NONE, external_reset_script=None, journal=False, checkpoint_interval=60, resume=False, backtrack=False, worker_id=None, events=False):
         self.graph_io = GraphIO()  
         self.sikuli = SikulixWrapper()
 
@@ -33,14 +39,21 @@ class GenerateGraph:
         self.retries = retries
         self.state_reset_method = state_reset_method
         self.external_reset_script = external_reset_script
+        self.events = events
+        self.sikuli.set_match_listener(self._match_event if events else None)
+        self.journal = journal
+        self.checkpoint_interval = checkpoint_interval
+        self.resume = resume
+        self.backtrack = backtrack
 
         self.graph = None
+        self.graph_journal = None
         self.visited_states = set()
-        self.lastInputs = []
-        self.inputs = {
-            value: [] for name, value in vars(ActionType).items()
-            if not name.startswith("__") and not callable(value)
-        }
+        self.completed_states = set()       # States whose buttons have all been explored
+        self.explored_actions = set()       # (state, action, button) already turned into transitions
+        self.last_checkpoint_time = time.time()
+        self.start_state = None             # State found when the executable is launched
+        self.dfs_stack = []                 # (origin, action, button) of the actions leading to the current state
         self.similarity = 1
 
         self.original_executable = self.selected_executable
@@ -50,18 +63,26 @@ class GenerateGraph:
 
         self.buttons_dir = "buttons"
         self.default_state_name = "State_"
+        self.state_search_interval = 0.2
         self.debug_name = "DebugImages"
         self.temp_dir = "Temp"
+        if worker_id is not None:
+            # Parallel workers must not share their copies of the executable
+            self.debug_name += "_" + str(worker_id)
+            self.temp_dir += "_" + str(worker_id)
         self.full_debug_name = os.path.join(os.getcwd(), self.debug_name)
         self.full_images_dir = os.path.join(os.getcwd(), self.images_dir)
         self.full_temp_dir = os.path.join(os.getcwd(), self.temp_dir)
+        self.catalog = ImageCatalog(self.full_images_dir, self.buttons_dir, self.valid_extensions)
+        self.checkpoint_file = str(self.practical_graph_file) + ".checkpoint"
+        self.checkpoint_graph_file = self.checkpoint_file + _graph_io_module.BINARY_GRAPH_EXTENSION
         
         self.phantom_state_counter = 0
         
     def generate_graph(self):
         # Check if external reset script is provided when the state reset method is EXTERNAL_RESET
         if self.state_reset_method == StateResetMethod.EXTERNAL_RESET:
-            if not os.path.isfile(self.external_reset_script):
+            if not self.external_reset_script or not os.path.isfile(self.external_reset_script):
                 print("[ERROR] Internal reset script not provided.")
                 return
         
@@ -87,10 +108,28 @@ class GenerateGraph:
         self.executable_thread = threading.Thread()
         self.executable_thread.start()
 
-        self._loop()
+        if self.resume and not self._load_checkpoint():
+            print("[ERROR] Could not resume, no valid checkpoint found at " + self.checkpoint_file)
+            return
+
+        if self.journal:
+            journal_file = self.practical_graph_file + ".journal"
+            print("[INFO] Journaling discovered nodes and transitions to " + journal_file)
+            # A resumed run starts the journal with the nodes and transitions of the checkpoint
+            self.graph_journal = self.graph_io.open_journal(self.images_dir, journal_file, self.graph)
+
+        try:
+            self._loop()
+        except BaseException:
+            # Keep everything explored so far so the run can be resumed
+            if self.checkpoint_interval:
+                self._save_checkpoint()
+            raise
         self._stop_executable()
         if self.graph is None:
             print("[ERROR] No graph generated.")
+            if self.graph_journal is not None:
+                self.graph_journal.close()
             return
         
         for node in self.graph.nodes:
@@ -99,7 +138,14 @@ class GenerateGraph:
                 print("[INFO] Transition: " + str(transition.action) + " -> " + str(transition.destination.name))
                 print("[INFO] Image: " + str(transition.image))
 
-        self.graph_io.write_graph(self.images_dir, self.practical_graph_file, self.graph)
+        written = self.graph_io.write_graph(self.images_dir, self.practical_graph_file, self.graph)
+        if self.graph_journal is not None:
+            # The journal is only kept if the final graph could not be written
+            self.graph_journal.close(remove=written)
+            self.graph_journal = None
+        if written:
+            self._remove_checkpoint()
+        return written
 
     def _start_executable(self):
         try:
@@ -138,7 +184,8 @@ class GenerateGraph:
     def _loop(self):
         print("[LOOP] Starting DFS graph generation loop...")
         self._ensure_executable_running()
-        self.graph = Graph()
+        if self.graph is None:
+            self.graph = Graph()
         self.graph.set_start_node(self._dfs_state())
         print("[LOOP] DFS graph loop finished.")
         self._stop_executable()
@@ -150,113 +197,71 @@ class GenerateGraph:
         current_state_name = None   # Name of the current state
 
         # Check if current state exists
-        similarity = self.initial_similarity
-        while similarity >= self.min_similarity and current_state is None:
-            print("[DFS] Searching for current state with similarity: " + str(similarity))
-            for candidate_state in os.listdir(self.full_images_dir):
-                candidate_path = os.path.join(self.full_images_dir, candidate_state)
-                # It must be a directory
-                if not os.path.isdir(candidate_path):
-                    continue
-
-                candidate_states = [f for f in os.listdir(candidate_path)
-                                    if os.path.isfile(os.path.join(candidate_path, f)) and os.path.splitext(f)[1].lower() in self.valid_extensions]
-                if not candidate_states:
-                    continue
-                
-                # There must be at least one image and the first one selected is the main state image
-                candidate_state_path = os.path.join(candidate_path, candidate_states[0])
-                print("[DFS] Checking if the screen matches: " + str(candidate_state_path))
-                if self.sikuli.search_image_once(candidate_state_path, similarity=similarity, timeout=self.timeout):
-                    # Create node in graph
-                    current_state_path = candidate_path
-                    current_state_name = candidate_state
-                    current_state = self.graph.add_node_with_image(current_state_name, candidate_state_path)
-                    print("[DFS] The screen matches with state: " + str(current_state_name))
-                    break
-                    
-            similarity -= self.similarity_step
+        identified = self._identify_state()
+        if identified is not None:
+            # Create node in graph
+            current_state_name, current_state_path, candidate_state_path = identified
+            current_state = self.graph.add_node_with_image(current_state_name, candidate_state_path)
         
         if current_state is not None:
+            if self.start_state is None:
+                self.start_state = current_state
             if self.debug_images:
                 self.sikuli.capture_error(current_state_name, self.full_debug_name)
 
             if current_state not in self.visited_states:
                 print("[DFS] Visiting state: " + str(current_state.name))
                 self.visited_states.add(current_state)
+                self._node_discovered(current_state)
 
                 # If there are no action types, return the current state (first found state)
                 if not any(isinstance(value, str) and name.isupper() for name, value in vars(ActionType).items()):
                     print("[DFS] No action types found.")
+                    self.completed_states.add(current_state)
                     return current_state
 
-                # Check if buttons folder exists
-                buttons_path = os.path.join(current_state_path, self.buttons_dir)
-                if not os.path.isdir(buttons_path):
-                    print("[DFS] No buttons folder found in " + str(current_state_path))
+                catalog_state = self.catalog.get_state(current_state_name)
+                if catalog_state is None or not catalog_state.buttons:
+                    print("[DFS] No buttons found in " + str(current_state_path))
+                    self.completed_states.add(current_state)
                     return current_state
 
-                buttons_input_path = None
-                for name, action_type in vars(ActionType).items():
-                    if isinstance(action_type, str) and name.isupper():
-                        print("[DFS] Checking action type: " + str(action_type))
-                        action_type_path = action_type.lower()
-                        aux_path = os.path.join(buttons_path, action_type_path)
-                        if not os.path.isdir(aux_path):
-                            print("[DFS] No " + action_type_path + " buttons folder in " + str(buttons_input_path))
-                            continue
-                        
-                        buttons_input_path = aux_path
-                        print("[DFS] " + action_type_path + " buttons folder found: " + str(buttons_input_path))
-                        
-                        # Check if there are button images in the folder
-                        buttons_input_path_names = [f for f in os.listdir(buttons_input_path) if os.path.isfile(os.path.join(buttons_input_path, f))]
-                        if not buttons_input_path_names:
-                            print("[DFS] No buttons found in " + str(buttons_input_path))
-                            continue
-                        
-                        print("[DFS] Buttons images found: " + str(buttons_input_path))
-                        for idx, btn in enumerate(buttons_input_path_names):
-                            btn_path = os.path.join(buttons_input_path, btn)
-                            
-                            if os.path.splitext(btn)[1].lower() not in self.valid_extensions:
-                                print("[DFS] Skipping non-image file: " + str(btn_path))
-                                continue
-                            print("[DFS] Simulating " + action_type + " with button image: " + str(btn_path))
-                            self.lastInputs.append(action_type)
-
-                            if self.debug_images:
-                                self.sikuli.capture_error(btn, self.full_debug_name)
-
-                            result, text = self._do_action(action_type, btn_path,buttons_input_path_names)
-                            if not result:
-                                print("[DFS] Could not " + str(action_type) + " on: " + str(btn_path))
-                                continue
-                                                  
-                            self._add_inputs_to_path(btn_path)
-                            dst_node = self._dfs_state()
-                            print("[DFS] Creating transition from node: " + str(current_state_name) + " with image: " + str(btn_path))
-                            transition = self.graph.add_transition(current_state, dst_node)
-                            transition.update_action(action_type)
-                            transition.update_image(btn_path)
-                            if action_type == ActionType.CLICK_AND_TYPE:
-                                transition.update_text(text)
-                            elif action_type == ActionType.DRAG_AND_DROP:  
-                                dir_path = os.path.dirname(btn_path)
-                                filename = os.path.basename(btn_path)
-                                name, ext = os.path.splitext(filename)
-                                match = re.search(r'(\d+)$', name)
-                                if match:
-                                    num = match.group(1)
-                                    if name.startswith("drag"):
-                                        drag_img = btn_path
-                                        drop_img = os.path.join(dir_path, "drop" + num + ext)
-                                    else:
-                                        drag_img = os.path.join(dir_path, "drag" + num + ext)
-                                        drop_img = btn_path
-                                    transition.update_drag_and_drop(drag_img, drop_img)
-
-                            self._restart_executable_and_continue()
+                for button in catalog_state.buttons:
+                    action_type = button.action
+                    btn_path = button.image
+                    if self._exploration_key(current_state_name, action_type, btn_path) in self.explored_actions:
+                        print("[DFS] Already explored before resuming: " + str(btn_path))
+                        continue
+                    print("[DFS] Simulating " + action_type + " with button image: " + str(btn_path))
+
+                    if self.debug_images:
+                        self.sikuli.capture_error(os.path.basename(btn_path), self.full_debug_name)
+
+                    result, text = self._do_action(action_type, btn_path, text=button.text)
+                    if not result:
+                        print("[DFS] Could not " + str(action_type) + " on: " + str(btn_path))
+                        continue
+
+                    self.dfs_stack.append((current_state, action_type, btn_path))
+                    dst_node = self._dfs_state()
+                    self.dfs_stack.pop()
+                    print("[DFS] Creating transition from node: " + str(current_state_name) + " with image: " + str(btn_path))
+                    transition = self.graph.add_transition(current_state, dst_node)
+                    transition.update_action(action_type)
+                    transition.update_image(btn_path)
+                    if action_type == ActionType.CLICK_AND_TYPE:
+                        transition.update_text(text)
+                    elif action_type == ActionType.DRAG_AND_DROP:
+                        transition.update_drag_and_drop(button.drag_image, button.drop_image)
+                        self.explored_actions.add(self._exploration_key(current_state_name, action_type, button.drag_image))
+                        self.explored_actions.add(self._exploration_key(current_state_name, action_type, button.drop_image))
+                    self.explored_actions.add(self._exploration_key(current_state_name, action_type, btn_path))
+                    self._transition_added(current_state, transition)
+                    self._checkpoint_if_due()
+
+                    self._return_to_state(dst_node, current_state)
+
+                self.completed_states.add(current_state)
                             
         else:
             print("[DFS] Current state not found")
@@ -264,6 +269,7 @@ class GenerateGraph:
             phantom_dir = os.path.join(self.full_images_dir, phantom_node_name)
             if not os.path.exists(phantom_dir):
                 os.makedirs(phantom_dir)
+                self.catalog.invalidate()
 
             if self.debug_images:
                 # Screenshot and save
@@ -273,19 +279,197 @@ class GenerateGraph:
             # Add the phantom node to the graph
             current_state = self.graph.add_node_with_image(phantom_node_name, file_path)
             print("[DFS] Phantom node created: " + phantom_node_name + " with image: " + file_path)
+            self._node_discovered(current_state)
 
             # Increment the counter
             self.phantom_state_counter += 1
         
         return current_state
 
-    def _do_action(self, action_type, btn_path,buttons_input_path_names ):
+    def _identify_state(self):
+        """
+            Scores one capture of the screen against the main image of every state folder
+            and takes the best match above min_similarity. Captures again until one matches
+            or timeout seconds have passed, so a state that is still appearing is not taken as unknown.
+            Returns (state name, state folder, main state image) or None if no state matches.
+        """
+        # The only check of the images directory in each DFS step
+        self.catalog.refresh()
+        states = self.catalog.states()
+        candidates = dict((state.image, state) for state in states)
+        candidate_paths = [state.image for state in states]
+
+        print("[DFS] Searching for current state among " + str(len(candidate_paths)) + " states")
+        deadline = time.time() + self.timeout
+        best_path, score = self.sikuli.best_match(candidate_paths, min_similarity=self.min_similarity)
+        while best_path is None:
+            if time.time() >= deadline:
+                return None
+            time.sleep(self.state_search_interval)
+            best_path, score = self.sikuli.best_match(candidate_paths, min_similarity=self.min_similarity)
+        state = candidates[best_path]
+        print("[DFS] The screen matches with state: " + str(state.name) + " (similarity " + str(score) + ")")
+        return state.name, state.folder, state.image
+
+    def serve_worker(self):
+        """
+            Parallel exploration worker. Reads one JSON task per line from stdin, with the path
+            to replay from the start state and the action to try, and answers with one result line
+            prefixed by WORKER_RESULT_PREFIX. Stops on EOF or on an exit command.
+        """
+        print("[WORKER] Waiting for tasks")
+        while True:
+            line = sys.stdin.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            task = json.loads(line)
+            if task.get("command") == "exit":
+                break
+            result = self._run_worker_task(task)
+            sys.stdout.write(WORKER_RESULT_PREFIX + json.dumps(result) + "\n")
+            sys.stdout.flush()
+        self._stop_executable()
+        print("[WORKER] Finished")
+
+    def _run_worker_task(self, task):
+        if not self._reset_executable():
+            return {"error": "Could not reset the executable"}
+        path = [tuple(step) for step in task.get("path", [])]
+        if path and not self._replay(path):
+            return {"error": "Could not replay the path to the state"}
+
+        result = {"text": None, "drag_image": None, "drop_image": None}
+        action_type = task.get("action")
+        btn_path = task.get("button")
+        if action_type:
+            done, text = self._do_action(action_type, btn_path)
+            if not done:
+                return {"error": "Could not " + str(action_type) + " on: " + str(btn_path)}
+            if action_type == ActionType.CLICK_AND_TYPE:
+                result["text"] = text
+            elif action_type == ActionType.DRAG_AND_DROP:
+                result["drag_image"], result["drop_image"] = self._drag_and_drop_images(btn_path)
+
+        identified = self._identify_state()
+        if identified is None:
+            result.update(state=None, image=None, buttons=[])
+        else:
+            state_name, state_path, state_image = identified
+            buttons = [(button.action, button.image) for button in self.catalog.get_state(state_name).buttons]
+            result.update(state=state_name, image=state_image, buttons=buttons)
+        return result
+
+    def _drag_and_drop_images(self, btn_path):
+        """
+            Returns the (drag image, drop image) pair of a dragN/dropN button image, or None if the name has no number
+        """
+        dir_path = os.path.dirname(btn_path)
+        name, ext = os.path.splitext(os.path.basename(btn_path))
+        match = re.search(r'(\d+)$', name)
+        if not match:
+            return None
+        num = match.group(1)
+        if name.startswith("drag"):
+            return btn_path, os.path.join(dir_path, "drop" + num + ext)
+        return os.path.join(dir_path, "drag" + num + ext), btn_path
+
+    def _exploration_key(self, state_name, action_type, btn_path):
+        return (state_name, action_type, os.path.relpath(btn_path, self.full_images_dir))
+
+    def _checkpoint_if_due(self):
+        if self.checkpoint_interval and time.time() - self.last_checkpoint_time >= self.checkpoint_interval:
+            self._save_checkpoint()
+
+    def _save_checkpoint(self):
+        """
+            Saves the partial graph and the explored states and buttons, so an interrupted
+            exploration can continue with --resume instead of starting again
+        """
+        if self.graph is None:
+            return
+        print("[CHECKPOINT] Saving checkpoint to " + self.checkpoint_file)
+        self.last_checkpoint_time = time.time()
+        if not self.graph_io.write_graph(self.images_dir, self.checkpoint_graph_file, self.graph):
+            return
+        checkpoint = {
+            "phantom_state_counter": self.phantom_state_counter,
+            "completed_states": sorted(node.name for node in self.completed_states),
+            "explored_actions": sorted(list(key) for key in self.explored_actions),
+        }
+        try:
+            temp_file = self.checkpoint_file + ".tmp"
+            with open(temp_file, "w") as f:
+                json.dump(checkpoint, f)
+            replace_file(temp_file, self.checkpoint_file)
+        except Exception as e:
+            print("[ERROR] Failed to save checkpoint: " + str(e))
+
+    def _load_checkpoint(self):
+        """
+            Restores the partial graph and exploration state saved by _save_checkpoint.
+            States that were being explored when the checkpoint was saved are explored again,
+            skipping the buttons that already produced a transition.
+        """
+        if not os.path.isfile(self.checkpoint_file) or not os.path.isfile(self.checkpoint_graph_file):
+            return False
+        try:
+            with open(self.checkpoint_file, "r") as f:
+                checkpoint = json.load(f)
+        except Exception as e:
+            print("[ERROR] Failed to read checkpoint: " + str(e))
+            return False
+
+        self.graph = self.graph_io.load_graph(self.checkpoint_graph_file, self.full_images_dir, use_cache=False)
+        if self.graph is None:
+            return False
+        self.phantom_state_counter = checkpoint.get("phantom_state_counter", 0)
+        self.completed_states = set(self.graph.get_node(name) for name in checkpoint.get("completed_states", []) if self.graph.is_node_in_graph(name))
+        self.visited_states = set(self.completed_states)
+        self.explored_actions = set(tuple(key) for key in checkpoint.get("explored_actions", []))
+        print("[CHECKPOINT] Resuming with " + str(len(self.graph.nodes)) + " states, " + str(len(self.completed_states)) + " fully explored")
+        return True
+
+    def _remove_checkpoint(self):
+        for checkpoint_file in (self.checkpoint_file, self.checkpoint_graph_file):
+            if os.path.exists(checkpoint_file):
+                os.remove(checkpoint_file)
+
+    def _node_discovered(self, node):
+        if self.graph_journal is not None:
+            self.graph_journal.append_node(node)
+        self._emit_event("node", name=node.name, image=node.image)
+
+    def _transition_added(self, origin, transition):
+        if self.graph_journal is not None:
+            self.graph_journal.append_transition(origin, transition)
+        self._emit_event("transition", origin=origin.name, destination=transition.destination.name,
+                         action=transition.action, image=transition.image)
+
+    def _match_event(self, image_path, seconds, found):
+        self._emit_event("match", image=image_path, seconds=seconds, found=found)
+
+    def _emit_event(self, event, **fields):
+        """
+            Writes a progress event as one JSON line prefixed by EVENT_PREFIX, when events are enabled
+        """
+        if not self.events:
+            return
+        fields["event"] = event
+        fields["time"] = time.time()
+        sys.stdout.write(EVENT_PREFIX + json.dumps(fields) + "\n")
+        sys.stdout.flush()
+
+    def _do_action(self, action_type, btn_path, text=None):
         if action_type is None or not ActionType.is_valid_action(action_type):
             print("[ERROR] No action type selected.")
             return False
 
+        # The screen must change after the action before it counts as settled
+        screen_before = self.sikuli.screen_checksum()
         result = False
-        text = None
         if action_type == ActionType.CLICK:
             print("[INFO] Clicking on: " + str(btn_path))
             result = self.sikuli.click_image(btn_path, similarity=self.similarity, timeout=self.timeout, retries=self.retries, similarity_reduction=self.similarity_step, capture_last_match=True, debug_image_name=os.path.basename(btn_path), debug_image_path=self.debug_name)
@@ -294,10 +478,10 @@ class GenerateGraph:
             result = self.sikuli.double_click_image(btn_path, similarity=self.similarity, timeout=self.timeout, retries=self.retries, similarity_reduction=self.similarity_step, capture_last_match=True, debug_image_name=os.path.basename(btn_path), debug_image_path=self.debug_name)
         elif action_type == ActionType.CLICK_AND_TYPE:
             txt_path = os.path.splitext(btn_path)[0] + ".txt"
-            if os.path.isfile(txt_path):
+            if text is None and os.path.isfile(txt_path):
                with open(txt_path, "r") as f:
                   text = f.read().strip()
-            else:
+            elif text is None:
                 print("[ERROR] No .txt file found for click and type: " + str(txt_path))
                 return False
             print("[INFO] Clicking and typing on: " + str(btn_path) + " with text: " + str(text))
@@ -328,37 +512,50 @@ class GenerateGraph:
                         drop_img = btn_path
                     print("[INFO] Dragging and dropping: " + str(drag_img) + " on: " + str(drop_img))
                     result = self.sikuli.drag_and_drop(drag_img, drop_img, similarity=self.similarity, timeout=self.timeout, retries=self.retries, similarity_reduction=self.similarity_step)
-                    if pair_name in buttons_input_path_names:
-                        buttons_input_path_names.remove(pair_name)
-                    return result, pair_name
                 else:
                     print("[ERROR] No pair image found for drag and drop: " + str(pair_path))
-                    if pair_name in buttons_input_path_names:
-                        buttons_input_path_names.remove(pair_name)
                     return False,None
                 
             print("[ERROR] Could not extract number from drag/drop image name: " + filename)
             return False, None
                 
 
-        # Add delay time after each action
-        time.sleep(self.transition_delay)
+        # Wait for the screen to change and settle after each action, at most transition_delay seconds.
+        # A failed action did not touch the screen, so it only has to be stable.
+        self.sikuli.wait_until_stable(self.transition_delay, changed_from=screen_before if result else None)
+        if action_type == ActionType.DRAG_AND_DROP:
+            return result, pair_name
         return result, text
 
-    def _restart_executable_and_continue(self):
-        self._stop_executable()
-        if not self.lastInputs:
-            print("[INFO] No last inputs to pop.")
-            return
-        last_key = self.lastInputs[-1]
-        if last_key not in self.inputs:
-            print("[ERROR] Last input not found in inputs: " + str(last_key))
+    def _return_to_state(self, from_state, target_state):
+        """
+            Goes back from from_state, where the executable is now, to target_state.
+            In backtrack mode the known transitions between both states are tried first,
+            the executable is only restarted if there is no such path or the state is not reached.
+        """
+        if self.backtrack and from_state is not None:
+            path = self._shortest_path(target_state, from_state)
+            if path is not None:
+                print("[BACKTRACK] Returning from " + str(from_state.name) + " to " + str(target_state.name) + " with " + str(len(path)) + " actions")
+                if self._replay(path) and self._is_current_state(target_state):
+                    return
+                print("[BACKTRACK] Could not return to " + str(target_state.name) + ", restarting the executable")
+        self._restart_executable_and_continue(target_state)
+
+    def _is_current_state(self, state):
+        if state.image is None:
+            return False
+        # Same best-of-all-states rule as the DFS, so a look-alike state is not taken for this one
+        identified = self._identify_state()
+        return identified is not None and identified[0] == state.name
+
+    def _restart_executable_and_continue(self, target_state):
+        if not self._reset_executable():
             return
-        if self.inputs[last_key]:
-            print("[INFO] Popping last input: " + str(self.inputs[last_key][-1]))
-            self.inputs[last_key].pop()
-        print("[INFO] Popping last input: " + str(self.lastInputs[-1]))
-        self.lastInputs.pop()
+        self._navigate_to_state(target_state)
+
+    def _reset_executable(self):
+        self._stop_executable()
         
         # Check if the state reset method is set to none, if so, just relaunch the original executable
         if self.state_reset_method == StateResetMethod.NONE:
@@ -374,33 +571,92 @@ class GenerateGraph:
                     subprocess.run([self.external_reset_script], check=True)
                 except Exception as e:
                     print("[ERROR] Failed to run external reset script: " + str(e))
-                    return
+                    return False
                 
         self._ensure_executable_running()
-        if self.lastInputs:
-            print("[INFO] Last inputs found, navigating to state: " + str(self.inputs[self.lastInputs[-1]]))
-            self._navigate_to_state(self.inputs, self.lastInputs)
-
-    def _add_inputs_to_path(self, btn_path):
-        self.inputs[self.lastInputs[-1]].append(btn_path)
-        print("[PATH] " + str(self.lastInputs[-1]) + " added to path: " + str(btn_path))
-
-    def _navigate_to_state(self, action_dict, action_list):
+        return True
+
+    def _navigate_to_state(self, target_state):
+        """
+            Brings the freshly launched executable to target_state replaying the shortest known
+            sequence of actions. If it fails, the executable is relaunched and the actions
+            that led the exploration to target_state are replayed instead.
+        """
+        exploration_path = [(action, btn) for _, action, btn in self.dfs_stack]
+        path = self._shortest_path(target_state)
+        if path is None:
+            path = exploration_path
+        if not path:
+            print("[NAVIGATE] Already at state: " + str(target_state.name))
+            return True
+
+        if self._replay(path):
+            return True
+        if path != exploration_path:
+            print("[NAVIGATE] Shortest path failed, replaying the exploration path")
+            if self._reset_executable():
+                return self._replay(exploration_path)
+        return False
+
+    def _replay(self, path):
         print("[NAVIGATE] Replaying the sequence: ")
-        for idx, action in enumerate(action_list):
-            for btn in action_dict[action]:
-                print("[SEQUENCE] " + str(btn))
-                result, text = self._do_action(action, btn,action_dict[action])
-                if not result:
-                    print("[ERROR] Failed to navigate to state: " + str(btn))
-                    break
+        self._emit_event("replay", steps=len(path))
+        for action, btn in path:
+            print("[SEQUENCE] " + str(action) + " " + str(btn))
+            result, text = self._do_action(action, btn)
+            if not result:
+                print("[ERROR] Failed to navigate to state: " + str(btn))
+                return False
         print("[NAVIGATE] Click sequence completed.")
+        return True
+
+    def _shortest_path(self, target_state, source_state=None):
+        """
+            Breadth-first search from source_state (the start state by default) to target_state over
+            the transitions found so far and the actions of the current exploration path, which are
+            not transitions yet.
+            Returns the list of (action, button) to replay, or None if target_state is not reachable.
+        """
+        if source_state is None:
+            source_state = self.start_state
+        if source_state is None or target_state is None:
+            return None
+        if target_state is source_state:
+            return []
+
+        # Destination of each action of the exploration path is the origin of the next one
+        pending_edges = {}
+        for i, (origin, action, btn) in enumerate(self.dfs_stack):
+            destination = self.dfs_stack[i + 1][0] if i + 1 < len(self.dfs_stack) else target_state
+            pending_edges.setdefault(origin, []).append((destination, action, btn))
+
+        previous = {source_state: None}
+        queue = deque([source_state])
+        while queue:
+            node = queue.popleft()
+            edges = [(t.destination, t.action, t.image) for t in node.transitions if ActionType.is_valid_action(t.action) and t.image]
+            edges.extend(pending_edges.get(node, []))
+            for destination, action, btn in edges:
+                if destination in previous:
+                    continue
+                previous[destination] = (node, action, btn)
+                if destination is target_state:
+                    path = []
+                    while previous[destination] is not None:
+                        destination, action, btn = previous[destination]
+                        path.append((action, btn))
+                    path.reverse()
+                    return path
+                queue.append(destination)
+        return None
 
     def _ensure_executable_running(self):
         if self.process is None:
+            screen_before = self.sikuli.screen_checksum()
             self.executable_thread = threading.Thread(target=self._start_executable)
             self.executable_thread.start()
-            time.sleep(self.executable_delay)
+            # The executable must change the screen before it counts as started
+            self.sikuli.wait_until_stable(self.executable_delay, changed_from=screen_before)
 
     def _copy_executable(self):
         # Check if the temp directory exists, if not, create it
@@ -423,13 +679,60 @@ class GenerateGraph:
                 shutil.copy2(s, d)
         self.selected_executable = os.path.join(self.full_temp_dir, os.path.basename(self.original_executable))
 
+def serve_requests(options):
+    """
+        Request loop of a long-lived Jython process, so the JVM and SikuliX are only started once.
+        Each line of stdin is a JSON request with a command and optional options overriding the
+        command line ones. Output is streamed while the request runs and the request ends with
+        one line prefixed by WORKER_RESULT_PREFIX. Commands:
+            generate: explore the executable and write the graph
+            replay: restart the executable and replay a path of [action, button image] steps
+            match: return the image that best matches the screen among the given images
+            exit: stop the loop
+    """
+    sys.stdout.write(WORKER_RESULT_PREFIX + json.dumps({"ready": True}) + "\n")
+    sys.stdout.flush()
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        request = json.loads(line)
+        command = request.get("command")
+        if command == "exit":
+            break
+
+        request_options = dict(options)
+        request_options.update(request.get("options", {}))
+        try:
+            generator = GenerateGraph(**request_options)
+            if command == "generate":
+                result = {"result": bool(generator.generate_graph())}
+            elif command == "replay":
+                path = [tuple(step) for step in request.get("path", [])]
+                replayed = generator._reset_executable() and generator._replay(path)
+                generator._stop_executable()
+                result = {"result": bool(replayed)}
+            elif command == "match":
+                image, score = generator.sikuli.best_match(request.get("images", []), min_similarity=generator.min_similarity)
+                result = {"image": image, "score": score}
+            else:
+                result = {"error": "Unknown command: " + str(command)}
+        except Exception as e:
+            print("[ERROR] Request " + str(command) + " failed: " + str(e))
+            result = {"error": str(e)}
+        sys.stdout.write(WORKER_RESULT_PREFIX + json.dumps(result) + "\n")
+        sys.stdout.flush()
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate a graph using SikuliX and a specified executable.")
     parser.add_argument("--images_dir", required=True, help="Path to the directory containing images.")
     parser.add_argument("--practical_graph_file", required=True, help="Name of the practical graph file to save.")
     parser.add_argument("--selected_executable", required=True, help="Path to the executable to run.")
-    parser.add_argument("--executable_delay", type=int, default=5, help="Delay in seconds after launched executable.")
-    parser.add_argument("--transition_delay", type=int, default=1, help="Delay in seconds between actions.")
+    parser.add_argument("--executable_delay", type=int, default=5, help="Maximum delay in seconds for the screen to settle after launching the executable.")
+    parser.add_argument("--transition_delay", type=int, default=1, help="Maximum delay in seconds for the screen to settle after each action.")
     parser.add_argument("--debug_images", action="store_true", help="Enable debug images.")
     parser.add_argument("--timeout", type=int, default=2, help="Timeout in seconds for image matching.")
     parser.add_argument("--initial_similarity", type=float, default=0.99, help="Initial similarity for image matching.")
@@ -438,10 +741,43 @@ if __name__ == "__main__":
     parser.add_argument("--retries", type=int, default=8, help="Number of retries for image matching.")
     parser.add_argument("--state_reset_method", type=str, default=StateResetMethod.NONE, choices=[StateResetMethod.NONE, StateResetMethod.COPY_RESET, StateResetMethod.EXTERNAL_RESET], help="State reset method to use.")
     parser.add_argument("--external_reset_script", type=str, help="Path to the external reset script to run. Only used if state_reset_method is EXTERNAL_RESET.")
+    parser.add_argument("--journal", action="store_true", help="Append each discovered node and transition to <practical_graph_file>.journal while exploring.")
+    parser.add_argument("--checkpoint_interval", type=int, default=60, help="Seconds between exploration checkpoints, 0 to disable them.")
+    parser.add_argument("--resume", action="store_true", help="Continue the exploration from the last checkpoint of practical_graph_file.")
+    parser.add_argument("--backtrack", action="store_true", help="Return to the previous state through known transitions before restarting the executable.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of executable instances explored in parallel, each one on its own Xvfb display (Linux only).")
+    parser.add_argument("--java_path", type=str, default="java", help="Java used to launch the parallel workers.")
+    parser.add_argument("--sikulix_jar", type=str, default="sikulixapi-2.0.5.jar", help="SikuliX jar used to launch the parallel workers.")
+    parser.add_argument("--events", action="store_true", help="Write progress events as JSON lines prefixed by " + EVENT_PREFIX.strip() + ".")
+    parser.add_argument("--serve", action="store_true", help="Keep running and read generate, replay and match requests as JSON lines from stdin.")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker_id", type=int, help=argparse.SUPPRESS)
 
     args = parser.parse_args()
 
-    generator = GenerateGraph(
+    if args.workers > 1 and not args.worker:
+        if args.resume or args.journal or args.backtrack:
+            print("[WARNING] --resume, --journal and --backtrack are not supported with --workers and are ignored by the parallel exploration")
+        # Workers receive the same arguments, without the ones only meant for the coordinator
+        worker_args = []
+        skip = False
+        for arg in sys.argv[1:]:
+            if skip:
+                skip = False
+                continue
+            if arg in ("--workers", "--java_path", "--sikulix_jar"):
+                skip = True
+                continue
+            if arg in ("--resume", "--journal", "--backtrack"):
+                continue
+            worker_args.append(arg)
+        worker_command = [args.java_path, "-cp", args.sikulix_jar, "org.python.util.jython", os.path.abspath(sys.argv[0])] + worker_args
+        explorer = ParallelExplorer(args.workers, worker_command, args.images_dir, args.practical_graph_file)
+        if explorer.generate_graph() is not None:
+            sys.exit(0)
+        print("[ERROR] Parallel exploration not available, exploring sequentially")
+
+    options = dict(
         images_dir=args.images_dir, 
         practical_graph_file=args.practical_graph_file, 
         selected_executable=args.selected_executable,
@@ -454,6 +790,20 @@ if __name__ == "__main__":
         similarity_step=args.similarity_step,
         retries=args.retries,
         state_reset_method=args.state_reset_method,
-        external_reset_script=args.external_reset_script
+        external_reset_script=args.external_reset_script,
+        journal=args.journal,
+        checkpoint_interval=args.checkpoint_interval,
+        resume=args.resume,
+        backtrack=args.backtrack,
+        worker_id=args.worker_id,
+        events=args.events
     )
-    generator.generate_graph()
+    if args.serve:
+        serve_requests(options)
+        sys.exit(0)
+
+    generator = GenerateGraph(**options)
+    if args.worker:
+        generator.serve_worker()
+    else:
+        generator.generate_graph()
@@ -1,7 +1,35 @@
 # -*- coding: utf-8 -*-
 import os
+import struct
+import sys
+import threading
+from array import array
+from collections import namedtuple, OrderedDict
 from actionTypes import ActionType
 from graphsDef import Graph
+from compactGraph import CompactGraph
+
+try:
+    import mmap
+except ImportError:
+    mmap = None  # Not available in Jython
+
+# Graph files with this extension use the binary format, any other extension uses the text format
+BINARY_GRAPH_EXTENSION = ".uigraph"
+BINARY_GRAPH_MAGIC = b"UIAG"
+BINARY_GRAPH_VERSION = 1
+# Magic, version, string count, node count, edge count, start node
+BINARY_GRAPH_HEADER = struct.Struct("<4sHiiii")
+BINARY_NO_VALUE = -1
+BINARY_NODE_FIELDS = 2  # name, image
+BINARY_EDGE_FIELDS = 7  # source, target, action, image, text, drag image, drop image
+
+# Maximum number of parsed graphs kept by GraphIO
+GRAPH_CACHE_SIZE = 8
+
+# Records yielded by GraphIO.iter_records, image paths are relative to the images directory
+VertexRecord = namedtuple("VertexRecord", ["name", "image", "line_number"])
+EdgeRecord = namedtuple("EdgeRecord", ["action", "source", "target", "image", "text", "drag_image", "drop_image", "line_number"])
 
 def singleton(cls):
     """
@@ -26,20 +54,29 @@ class GraphIO:
         Initializes the GraphIO instance
         """
         self.graph = None 
+        # (graph file, images dir) -> (mtime, size, CompactGraph), least recently used first
+        self.graph_cache = OrderedDict()
 
-    def load_graph(self, graph_file, img_dir):
+    def load_graph(self, graph_file, img_dir, use_cache=True, validate_images=True, validation_workers=1):
         """
-        Loads the graph definition from the file and creates a Graph object
+        Loads the graph definition from the file and creates a Graph object.
+        Parsed graphs are cached while the file keeps its modification time and size,
+        every call returns a new Graph so callers can modify it freely.
 
         Args:
             graph_file (str): Path to the graph definition file
             img_dir (str): Directory containing the images
+            use_cache (bool): Reuse the graph parsed by a previous call if the file did not change
+            validate_images (bool): Check that the vertex images exist, disable it for trusted files
+            validation_workers (int): Threads listing image directories, useful on remote filesystems
 
         Returns:
             Graph: A Graph object populated with nodes and transitions
         """
         self.graph = None
-        print("[INFO] Loading graph from " + graph_file)
+        first_node = None
+        loaded = False
+        print("[INFO] Loading graph from " + str(graph_file))
         try:
             if img_dir is None or not os.path.isdir(img_dir):
                 print("[ERROR] Image directory not found: " + str(img_dir))
@@ -47,82 +84,314 @@ class GraphIO:
             if graph_file is None or not os.path.isfile(graph_file):
                 print("[ERROR] Graph file not found: " + str(graph_file))
                 return None
+
+            cache_key = (os.path.abspath(graph_file), os.path.abspath(img_dir), validate_images)
+            stat = os.stat(graph_file)
+            file_stamp = (stat.st_mtime, stat.st_size)
+            if use_cache:
+                cached = self.graph_cache.get(cache_key)
+                if cached is not None and cached[0] == file_stamp:
+                    print("[INFO] Graph file unchanged, using cached graph")
+                    # Refresh the entry as the most recently used
+                    del self.graph_cache[cache_key]
+                    self.graph_cache[cache_key] = cached
+                    self.graph = cached[1].to_graph()
+                    return self.graph
         
             self.graph = Graph()  # Create a new Graph instance
-            with open(graph_file, "r") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    parts = line.split()
-                    if parts[0] == 'v' and len(parts) == 3:
-                        name = parts[1]
-                        raw_path = parts[2]
-                        node = self.graph.add_node(name)
-                        if node:
-                            image_path = os.path.join(img_dir, raw_path)
-                            if not os.path.isfile(image_path):
-                                print("[ERROR] Image file not found: " + image_path)
-                                continue
-                            node.set_image(os.path.join(img_dir, raw_path))
-
-                    elif parts[0] == 'e':
-                        action_str = parts[1]
-                        src_name = parts[2] if len(parts) > 2 else None
-                        tgt_name = parts[3] if len(parts) > 3 else None
-
-                        src_node = next((n for n in self.graph.nodes if n.name == src_name), None)
-                        tgt_node = next((n for n in self.graph.nodes if n.name == tgt_name), None)
-                        if not src_node or not tgt_node:
-                            print("[ERROR] Source or target node not found for edge: " + line)
-                            continue
-
-                        try:
-                            action = ActionType.from_string(action_str)
-                        except KeyError:
-                            print("[ERROR] Unknown action " + action_str + " in graph file")
-                            continue
-
-                        if action in (ActionType.CLICK, ActionType.DOUBLE_CLICK):
-                            if len(parts) != 5:
-                                print("[ERROR] Invalid number of args for " + action_str + ", expected 5 but got " + str(len(parts)))
-                                continue
-                            img = parts[4]
-                            if action == ActionType.CLICK:
-                                self.handle_click_action(src_node, tgt_node, os.path.join(img_dir, img))
-                            else:
-                                self.handle_double_click_action(src_node, tgt_node, os.path.join(img_dir, img))
-
-                        elif action == ActionType.CLICK_AND_TYPE:
-                            if len(parts) != 6:
-                                print("[ERROR] Invalid number of args for CLICK_AND_TYPE, expected 6 but got " + str(len(parts)))
-                                continue
-                            img = parts[4]
-                            text = parts[5]
-                            self.handle_click_and_type_action(src_node, tgt_node, text, os.path.join(img_dir, img))
-
-                        elif action == ActionType.DRAG_AND_DROP:
-                            if len(parts) != 6:
-                                print("[ERROR] Invalid number of args for DRAG_AND_DROP, expected 6 but got " + str(len(parts)))
-                                continue
-                            drag_img = parts[4]
-                            drop_img = parts[5]
-                            self.handle_drag_and_drop_action(src_node, tgt_node, os.path.join(img_dir, drag_img), os.path.join(img_dir, drop_img))
-
-                        else:
-                            print("[ERROR] Unsupported action type: " + action_str)
-
-        except FileNotFoundError:
+            nodes_by_name = {}      # Name -> Node of the vertices read so far
+            pending_edges = []      # Edges are resolved once every vertex is known
+            pending_images = []     # Vertex images are validated together once the file is read
+            for record in self.iter_records(graph_file):
+                if isinstance(record, VertexRecord):
+                    node = self.graph.add_node(record.name)
+                    if node:
+                        nodes_by_name[record.name] = node
+                        if first_node is None:
+                            first_node = node
+                        if record.image is not None:
+                            pending_images.append((node, os.path.join(img_dir, record.image)))
+                else:
+                    pending_edges.append(record)
+
+            existing_images = None
+            if validate_images:
+                existing_images = self.find_existing_images([image_path for _, image_path in pending_images], validation_workers)
+            for node, image_path in pending_images:
+                if existing_images is not None and image_path not in existing_images:
+                    print("[ERROR] Image file not found: " + image_path)
+                    continue
+                node.set_image(image_path, check_exists=False)
+
+            for record in pending_edges:
+                self.load_edge(record, nodes_by_name, img_dir)
+            loaded = True
+
+        except (IOError, OSError):
             print("[ERROR] Graph file not found: " + graph_file)
         except Exception as e:
             print("[ERROR] An error occurred while loading the graph: " + str(e))
 
         if self.graph is not None and self.graph.nodes:
-            first_node = next(iter(self.graph.nodes))
+            # The first vertex of the file is the start node
+            if first_node is None or first_node not in self.graph.nodes:
+                first_node = next(iter(self.graph.nodes))
             self.graph.set_start_node(first_node)
 
+        if loaded and self.graph is not None:
+            self.cache_graph(cache_key, file_stamp, self.graph)
+
         return self.graph
 
+    def find_existing_images(self, image_paths, workers=1):
+        """
+        Checks which images exist listing each directory only once instead of
+        querying the filesystem for every file
+
+        Args:
+            image_paths (list): Paths of the images to check
+            workers (int): Number of threads listing directories in parallel
+
+        Returns:
+            set: The paths of image_paths that are existing files
+        """
+        paths_by_dir = {}
+        for image_path in image_paths:
+            directory, name = os.path.split(image_path)
+            paths_by_dir.setdefault(directory, []).append((os.path.normcase(name), image_path))
+
+        listings = {}
+        directories = list(paths_by_dir)
+        if workers > 1 and len(directories) > 1:
+            threads = []
+            for i in range(min(workers, len(directories))):
+                thread = threading.Thread(target=self._list_directories, args=(directories[i::workers], listings))
+                threads.append(thread)
+                thread.start()
+            for thread in threads:
+                thread.join()
+        else:
+            self._list_directories(directories, listings)
+
+        existing = set()
+        for directory, entries in paths_by_dir.items():
+            files = listings.get(directory, ())
+            for name, image_path in entries:
+                if name in files:
+                    existing.add(image_path)
+        return existing
+
+    def _list_directories(self, directories, listings):
+        """
+        Stores in listings the normalized names of the files of each directory
+        """
+        for directory in directories:
+            try:
+                if hasattr(os, "scandir"):
+                    files = set(os.path.normcase(entry.name) for entry in os.scandir(directory or ".") if entry.is_file())
+                else:
+                    # Jython / Python 2 fallback, directories are not filtered out
+                    files = set(os.path.normcase(name) for name in os.listdir(directory or "."))
+            except OSError:
+                files = set()
+            listings[directory] = files
+
+    def cache_graph(self, cache_key, file_stamp, graph):
+        """
+        Stores an immutable snapshot of a parsed graph, evicting the least recently used one if full
+
+        Args:
+            cache_key (tuple): Absolute graph file, images directory and whether images were validated
+            file_stamp (tuple): Modification time and size of the graph file
+            graph (Graph): Parsed graph
+        """
+        self.graph_cache.pop(cache_key, None)
+        self.graph_cache[cache_key] = (file_stamp, CompactGraph.from_graph(graph))
+        while len(self.graph_cache) > GRAPH_CACHE_SIZE:
+            self.graph_cache.popitem(last=False)
+
+    def invalidate_cache(self, graph_file=None):
+        """
+        Drops the cached graphs of a file, or every cached graph if no file is given
+        """
+        if graph_file is None:
+            self.graph_cache.clear()
+            return
+        graph_file = os.path.abspath(graph_file)
+        for key in [k for k in self.graph_cache if k[0] == graph_file]:
+            del self.graph_cache[key]
+
+    def iter_records(self, graph_file):
+        """
+        Lazily reads a graph file, yielding one record per vertex or edge line.
+        Nothing is logged for valid lines and no Node or Transition is created,
+        so huge files can be processed in bounded memory.
+
+        Args:
+            graph_file (str): Path to the graph definition file
+
+        Yields:
+            VertexRecord or EdgeRecord: Records in file order, with image paths relative to the images directory
+        """
+        if self.is_binary_graph_file(graph_file):
+            for record in self.iter_binary_records(graph_file):
+                yield record
+            return
+
+        with open(graph_file, "r") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                parts = line.split()
+                if parts[0] == 'v' and len(parts) == 3:
+                    yield VertexRecord(parts[1], parts[2], line_number)
+                elif parts[0] == 'e':
+                    record = self.parse_edge(parts, line_number)
+                    if record is not None:
+                        yield record
+
+    def parse_edge(self, parts, line_number):
+        """
+        Parses the fields of an 'e' line of a graph file
+
+        Args:
+            parts (list): Whitespace-separated fields of the line
+            line_number (int): Line number in the file, used in error messages
+
+        Returns:
+            EdgeRecord: The parsed edge, or None if the line is not valid
+        """
+        if len(parts) < 4:
+            print("[ERROR] Source or target node missing for edge at line " + str(line_number) + ": " + " ".join(parts))
+            return None
+        action_str = parts[1]
+
+        try:
+            action = ActionType.from_string(action_str)
+        except (KeyError, ValueError):
+            print("[ERROR] Unknown action " + action_str + " in graph file")
+            return None
+
+        image = text = drag_image = drop_image = None
+        if action in (ActionType.CLICK, ActionType.DOUBLE_CLICK):
+            if len(parts) != 5:
+                print("[ERROR] Invalid number of args for " + action_str + ", expected 5 but got " + str(len(parts)))
+                return None
+            image = parts[4]
+
+        elif action == ActionType.CLICK_AND_TYPE:
+            if len(parts) != 6:
+                print("[ERROR] Invalid number of args for CLICK_AND_TYPE, expected 6 but got " + str(len(parts)))
+                return None
+            image = parts[4]
+            text = parts[5]
+
+        elif action == ActionType.DRAG_AND_DROP:
+            if len(parts) != 6:
+                print("[ERROR] Invalid number of args for DRAG_AND_DROP, expected 6 but got " + str(len(parts)))
+                return None
+            drag_image = parts[4]
+            drop_image = parts[5]
+
+        else:
+            print("[ERROR] Unsupported action type: " + action_str)
+            return None
+
+        return EdgeRecord(action, parts[2], parts[3], image, text, drag_image, drop_image, line_number)
+
+    def is_binary_graph_file(self, graph_file):
+        """
+        Returns True if the graph file uses the binary format, chosen by its extension
+        """
+        return os.path.splitext(graph_file)[1].lower() == BINARY_GRAPH_EXTENSION
+
+    def iter_binary_records(self, graph_file, use_mmap=True):
+        """
+        Reads a binary graph file, yielding the same records as iter_records.
+        The line_number of each record is its index in the file.
+
+        Binary layout (little endian):
+            header: magic, version, string count, node count, edge count, start node id
+            string table: for each string, its byte length (uint32) and its UTF-8 bytes
+            nodes: name id and image id (int32) for each node
+            edges: source id, target id, action id, image id, text id, drag image id and
+                   drop image id (int32) for each edge
+        Missing values are stored as -1. The start node is always the first node.
+
+        Args:
+            graph_file (str): Path to the binary graph file
+            use_mmap (bool): Map the file in memory instead of reading it, when mmap is available
+
+        Yields:
+            VertexRecord or EdgeRecord: Vertices first, then edges
+        """
+        with open(graph_file, "rb") as f:
+            data = None
+            if use_mmap and mmap is not None and os.path.getsize(graph_file) > 0:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = f.read()
+            try:
+                magic, version, string_count, node_count, edge_count, start_node = BINARY_GRAPH_HEADER.unpack_from(data, 0)
+                if magic != BINARY_GRAPH_MAGIC or version != BINARY_GRAPH_VERSION:
+                    raise ValueError("Not a binary graph file or unsupported version: " + graph_file)
+                offset = BINARY_GRAPH_HEADER.size
+
+                strings = []
+                for _ in range(string_count):
+                    length = struct.unpack_from("<I", data, offset)[0]
+                    offset += 4
+                    strings.append(data[offset:offset + length].decode("utf-8"))
+                    offset += length
+
+                def string(string_id):
+                    return None if string_id == BINARY_NO_VALUE else strings[string_id]
+
+                size = node_count * BINARY_NODE_FIELDS * 4
+                nodes = _int_array_from_bytes(data[offset:offset + size])
+                offset += size
+                names = []
+                for i in range(node_count):
+                    name = string(nodes[i * BINARY_NODE_FIELDS])
+                    names.append(name)
+                    yield VertexRecord(name, string(nodes[i * BINARY_NODE_FIELDS + 1]), i)
+
+                size = edge_count * BINARY_EDGE_FIELDS * 4
+                edges = _int_array_from_bytes(data[offset:offset + size])
+                for i in range(edge_count):
+                    e = edges[i * BINARY_EDGE_FIELDS:(i + 1) * BINARY_EDGE_FIELDS]
+                    yield EdgeRecord(string(e[2]), names[e[0]], names[e[1]], string(e[3]), string(e[4]), string(e[5]), string(e[6]), node_count + i)
+            finally:
+                if mmap is not None and isinstance(data, mmap.mmap):
+                    data.close()
+
+    def load_edge(self, record, nodes_by_name, img_dir):
+        """
+        Creates the transition described by an edge record
+
+        Args:
+            record (EdgeRecord): Edge read from the graph file
+            nodes_by_name (dict): Nodes of the graph indexed by name
+            img_dir (str): Directory containing the images
+        """
+        src_node = nodes_by_name.get(record.source)
+        tgt_node = nodes_by_name.get(record.target)
+        if not src_node or not tgt_node:
+            print("[ERROR] Source or target node not found for edge at line " + str(record.line_number) + ": " + record.source + " -> " + record.target)
+            return
+
+        if record.action == ActionType.CLICK:
+            self.handle_click_action(src_node, tgt_node, os.path.join(img_dir, record.image))
+        elif record.action == ActionType.DOUBLE_CLICK:
+            self.handle_double_click_action(src_node, tgt_node, os.path.join(img_dir, record.image))
+        elif record.action == ActionType.CLICK_AND_TYPE:
+            self.handle_click_and_type_action(src_node, tgt_node, record.text, os.path.join(img_dir, record.image))
+        elif record.action == ActionType.DRAG_AND_DROP:
+            self.handle_drag_and_drop_action(src_node, tgt_node, os.path.join(img_dir, record.drag_image), os.path.join(img_dir, record.drop_image))
+        else:
+            print("[ERROR] Unsupported action type: " + str(record.action))
+
     def handle_click_action(self, src_node, tgt_node, image_path):
         transition = self.graph.add_transition(src_node, tgt_node)
         if not transition:
@@ -161,42 +430,254 @@ class GraphIO:
         print("[INFO] DRAG_AND_DROP action handled")
 
     def write_graph(self, images_dir, graph_file, graph):
+        """
+        Writes the graph to a temporary file that replaces graph_file once complete,
+        so a crash while writing never leaves a truncated graph
+
+        Returns:
+            bool: True if the graph was written
+        """
+        # The file may be rewritten within the mtime resolution, never trust the cached copy
+        self.invalidate_cache(graph_file)
+        if self.is_binary_graph_file(graph_file):
+            return self.write_binary_graph(images_dir, graph_file, graph)
+
         print("[INFO] Writing graph to " + graph_file)
+        temp_file = graph_file + ".tmp"
         try:
-            with open(graph_file, "w") as f:
-                edge_lines = []
-                # Iterate nodes and write only the vertices, but accumulate edges
-                for node in graph.nodes:
-                    node_name = node.name.replace(" ", "_")
-                    if node.image:
-                        image_name = os.path.relpath(node.image, images_dir).replace("/", "\\")
-                    else:
-                        image_name = "unknown_image"
-                        print("[WARNING] Node " + node_name + " has no valid image path.")
-                    f.write("v " + node_name + " " + image_name + "\n")
-
-                    for trans in node.transitions:
-                        act = trans.action if trans.action else "None"
-                        dst = trans.destination.name.replace(" ", "_")
-
-                        if act in (ActionType.CLICK, ActionType.DOUBLE_CLICK):
-                            image_name = trans.image.split(images_dir, 1)[1].lstrip("/\\")
-                            edge_lines.append("e " + act + " " + node_name + " " + dst + " " + image_name + "\n")
-
-                        elif act == ActionType.CLICK_AND_TYPE:
-                            image_name = trans.image.split(images_dir, 1)[1].lstrip("/\\")
-                            edge_lines.append("e " + act + " " + node_name + " " + dst + " " + image_name + " " + trans.text + "\n")
-
-                        elif act == ActionType.DRAG_AND_DROP:
-                            drag_image_name = os.path.relpath(trans.drag_image, images_dir).replace("/", "\\")
-                            drop_image_name = os.path.relpath(trans.drop_image, images_dir).replace("/", "\\")
-                            edge_lines.append("e " + act + " " + node_name + " " + dst + " " + drag_image_name + " " + drop_image_name + "\n")
-
-                        else:
-                            edge_lines.append("e " + act + " " + node_name + " " + dst + "\n")
-                # Write all edges at the end
+            formatter = GraphLineFormatter(images_dir)
+            vertex_lines = []
+            edge_lines = []
+            # Write the vertices first, edges are accumulated and written at the end.
+            # The start node goes first so the loader selects it again
+            for node in sorted(graph.nodes, key=lambda n: n is not graph.startNode):
+                vertex_lines.append(formatter.vertex_line(node))
+                for trans in node.transitions:
+                    edge_lines.append(formatter.edge_line(node, trans))
+
+            with open(temp_file, "w") as f:
+                f.writelines(vertex_lines)
                 f.writelines(edge_lines)
+            replace_file(temp_file, graph_file)
         except Exception as e:
             print("[ERROR] Exception while writing the graph: " + str(e))
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return False
+        print("[INFO] Graph successfully written to " + graph_file)
+        return True
+
+    def open_journal(self, images_dir, journal_file, graph=None):
+        """
+        Opens an append-only journal where nodes and transitions are written as they are discovered.
+        The journal uses the text format, so it can be loaded with load_graph after a crash.
+
+        Args:
+            images_dir (str): Directory containing the images
+            journal_file (str): Path to the journal file, it is truncated
+            graph (Graph): Graph already explored, such as a resumed checkpoint, written to the journal first
+
+        Returns:
+            GraphJournal: The opened journal
+        """
+        self.invalidate_cache(journal_file)
+        journal = GraphJournal(images_dir, journal_file)
+        if graph is not None:
+            journal.append_graph(graph)
+        return journal
+
+    def write_binary_graph(self, images_dir, graph_file, graph):
+        """
+        Writes the graph in the binary format described in iter_binary_records.
+        Image paths are stored relative to images_dir and texts may contain spaces.
+
+        Args:
+            images_dir (str): Directory containing the images
+            graph_file (str): Path to the binary graph file
+            graph (Graph): Graph to write
+        """
+        print("[INFO] Writing binary graph to " + graph_file)
+        try:
+            strings = []
+            string_ids = {}
+            relative_paths = {}
+
+            def string_id(value):
+                if value is None:
+                    return BINARY_NO_VALUE
+                if value not in string_ids:
+                    string_ids[value] = len(strings)
+                    strings.append(value)
+                return string_ids[value]
+
+            def image_id(image_path):
+                if image_path is None:
+                    return BINARY_NO_VALUE
+                if image_path not in relative_paths:
+                    relative_paths[image_path] = os.path.relpath(image_path, images_dir)
+                return string_id(relative_paths[image_path])
+
+            # The start node goes first so the loader selects it again
+            nodes = sorted(graph.nodes, key=lambda n: n is not graph.startNode)
+            node_ids = {}
+            node_values = []
+            for node in nodes:
+                node_ids[node] = len(node_ids)
+                node_values.append(string_id(node.name))
+                node_values.append(image_id(node.image))
+
+            edge_values = []
+            for node in nodes:
+                for trans in node.transitions:
+                    edge_values.extend([
+                        node_ids[node],
+                        node_ids[trans.destination],
+                        string_id(trans.action if trans.action else ActionType.NONE),
+                        image_id(trans.image),
+                        string_id(trans.text),
+                        image_id(trans.drag_image),
+                        image_id(trans.drop_image),
+                    ])
+
+            temp_file = graph_file + ".tmp"
+            with open(temp_file, "wb") as f:
+                f.write(BINARY_GRAPH_HEADER.pack(BINARY_GRAPH_MAGIC, BINARY_GRAPH_VERSION, len(strings), len(nodes), len(edge_values) // BINARY_EDGE_FIELDS, 0 if nodes else BINARY_NO_VALUE))
+                for value in strings:
+                    encoded = value.encode("utf-8")
+                    f.write(struct.pack("<I", len(encoded)))
+                    f.write(encoded)
+                f.write(_int_array_to_bytes(node_values))
+                f.write(_int_array_to_bytes(edge_values))
+            replace_file(temp_file, graph_file)
+        except Exception as e:
+            print("[ERROR] Exception while writing the binary graph: " + str(e))
+            if os.path.exists(graph_file + ".tmp"):
+                os.remove(graph_file + ".tmp")
+            return False
+        print("[INFO] Graph successfully written to " + graph_file)
+        return True
+
+def _int_array_to_bytes(values):
+    """
+    Packs a list of ints as little endian int32
+    """
+    values = array("i", values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes() if hasattr(values, "tobytes") else values.tostring()
+
+def _int_array_from_bytes(data):
+    """
+    Unpacks little endian int32 bytes into an array of ints
+    """
+    values = array("i")
+    if hasattr(values, "frombytes"):
+        values.frombytes(data)
+    else:
+        values.fromstring(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+def replace_file(source, destination):
+    """
+    Renames source to destination, replacing it atomically when the platform allows it
+    """
+    if hasattr(os, "replace"):
+        os.replace(source, destination)
+    else:
+        # Jython / Python 2 on Windows cannot rename over an existing file
+        if os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
+
+class GraphLineFormatter:
+    """
+    Formats nodes and transitions as lines of the text graph format,
+    computing the relative path of each image only once
+    """
+
+    def __init__(self, images_dir):
+        self.images_dir = images_dir
+        self.vertex_paths = {}
+        self.edge_paths = {}
+
+    def vertex_image(self, image_path):
+        if image_path not in self.vertex_paths:
+            self.vertex_paths[image_path] = os.path.relpath(image_path, self.images_dir).replace("/", "\\")
+        return self.vertex_paths[image_path]
+
+    def edge_image(self, image_path):
+        if image_path not in self.edge_paths:
+            self.edge_paths[image_path] = image_path.split(self.images_dir, 1)[1].lstrip("/\\")
+        return self.edge_paths[image_path]
+
+    def vertex_line(self, node):
+        node_name = node.name.replace(" ", "_")
+        if node.image:
+            image_name = self.vertex_image(node.image)
         else:
-            print("[INFO] Graph successfully written to " + graph_file)
+            image_name = "unknown_image"
+            print("[WARNING] Node " + node_name + " has no valid image path.")
+        return "v " + node_name + " " + image_name + "\n"
+
+    def edge_line(self, node, trans):
+        node_name = node.name.replace(" ", "_")
+        act = trans.action if trans.action else "None"
+        dst = trans.destination.name.replace(" ", "_")
+
+        if act in (ActionType.CLICK, ActionType.DOUBLE_CLICK):
+            return "e " + act + " " + node_name + " " + dst + " " + self.edge_image(trans.image) + "\n"
+
+        elif act == ActionType.CLICK_AND_TYPE:
+            return "e " + act + " " + node_name + " " + dst + " " + self.edge_image(trans.image) + " " + trans.text + "\n"
+
+        elif act == ActionType.DRAG_AND_DROP:
+            drag_image_name = self.vertex_image(trans.drag_image)
+            drop_image_name = self.vertex_image(trans.drop_image)
+            return "e " + act + " " + node_name + " " + dst + " " + drag_image_name + " " + drop_image_name + "\n"
+
+        return "e " + act + " " + node_name + " " + dst + "\n"
+
+class GraphJournal:
+    """
+    Append-only text graph file, every line is flushed as soon as it is written
+    """
+
+    def __init__(self, images_dir, journal_file):
+        self.journal_file = journal_file
+        self.formatter = GraphLineFormatter(images_dir)
+        self.file = open(journal_file, "w")
+
+    def append_node(self, node):
+        self._write(self.formatter.vertex_line(node))
+
+    def append_transition(self, origin, transition):
+        self._write(self.formatter.edge_line(origin, transition))
+
+    def append_graph(self, graph):
+        """
+        Writes every node and transition of the graph, the start node first
+        """
+        for node in sorted(graph.nodes, key=lambda n: n is not graph.startNode):
+            self.append_node(node)
+        for node in graph.nodes:
+            for transition in node.transitions:
+                self.append_transition(node, transition)
+
+    def _write(self, line):
+        if self.file is None:
+            print("[ERROR] Graph journal " + self.journal_file + " is closed.")
+            return
+        self.file.write(line)
+        self.file.flush()
+
+    def close(self, remove=False):
+        """
+        Closes the journal, removing the file if it is no longer needed
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if remove and os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
@@ -1,6 +1,27 @@
 # -*- coding: utf-8 -*-
 from os import path
 
+try:
+    from sys import intern as _intern
+except ImportError:
+    _intern = intern  # Jython / Python 2
+
+"""
+    Interns the string so repeated image paths and action names share a single object
+"""
+def intern_string(value):
+    if isinstance(value, str):
+        return _intern(value)
+    return value
+
+"""
+    Normalizes an image path so that the same file is always indexed with the same key
+"""
+def normalize_image_path(image_path):
+    if image_path is None:
+        return None
+    return path.normcase(path.abspath(image_path))
+
 """
     Class Node contains information about the image that represents the state, and a list of transitions 
     
@@ -8,22 +29,36 @@ from os import path
         name (str): State name
         image (Path): Path to image of the state
         transitions (list): List of transitions to change state
+        incoming (set): Transitions of other nodes (or itself) whose destination is this node
+        graph (Graph): Graph the node belongs to, None if it is not in a graph
 """
 class Node:
     def __init__(self, name):
         self.name = name
         self.image = None
         self.transitions = []
+        self.incoming = set()
+        self.graph = None
 
-    def set_image(self, image_path):
-        if path.exists(image_path):
-            self.image = image_path
+    """
+        Sets the image of the node if the file exists.
+        check_exists can be disabled when the caller already validated the path.
+    """
+    def set_image(self, image_path, check_exists=True):
+        if not check_exists or path.exists(image_path):
+            old_image = self.image
+            self.image = intern_string(image_path)
+            if self.graph is not None:
+                self.graph.update_node_image_index(self, old_image)
             print("[INFO] Image set to '" + image_path + "' for node " + self.name)
         else:
             print("[ERROR] Image path '" + image_path + "' does not exist")
 
     def add_transition(self, transition):
+        transition.origin = self
         self.transitions.append(transition)
+        if transition.destination is not None:
+            transition.destination.incoming.add(transition)
 
     """
         Removes the transition to a node
@@ -33,8 +68,30 @@ class Node:
             if t.destination == _node:
                 # Remove only the first occurrence
                 print("[INFO] Removing transition from '" + self.name + "' to '" + _node.name + "'.")
-                del self.transitions[i]
+                self._detach_transition(i)
                 break
+
+    """
+        Removes the last transition of the node
+        Returns the removed transition or None if the node has no transitions
+    """
+    def pop_transition(self):
+        if not self.transitions:
+            return None
+        return self._detach_transition(len(self.transitions) - 1)
+
+    def _detach_transition(self, index):
+        t = self.transitions.pop(index)
+        if t.destination is not None:
+            t.destination.incoming.discard(t)
+        t.origin = None
+        return t
+
+    """
+        Returns the nodes with at least one transition to this node
+    """
+    def get_predecessors(self):
+        return set(t.origin for t in self.incoming)
         
     """
         Updates the name of the node
@@ -61,6 +118,7 @@ class Node:
     Class Transition contains a condition to go to destination node
     
     Attributes:
+        origin (Node): Node the transition belongs to, None until it is added to a node
         destination (Node): Destination node
         condition (callable): Condition function
         action (ActionType): Type of action (CLICK, etc.)
@@ -71,6 +129,7 @@ class Node:
 """
 class Transition:
     def __init__(self, destination):
+        self.origin = None
         self.destination = destination
         self.action = None
         self.image = None
@@ -82,13 +141,13 @@ class Transition:
         Update the action type of this transition.
     """
     def update_action(self, action):
-        self.action = action
+        self.action = intern_string(action)
 
     """
         Update the image for this transition.
     """
     def update_image(self, image_path):
-        self.image = image_path
+        self.image = intern_string(image_path)
 
     """
         Update the text for CLICK_AND_TYPE transitions.
@@ -100,25 +159,34 @@ class Transition:
         Update the destination node
     """
     def update_destination(self, node):
+        if self.origin is not None:
+            if self.destination is not None:
+                self.destination.incoming.discard(self)
+            if node is not None:
+                node.incoming.add(self)
         self.destination = node
 
     """
     Update drag and drop images for this transition.
     """
     def update_drag_and_drop(self, drag_image, drop_image):
-        self.drag_image = drag_image
-        self.drop_image = drop_image
+        self.drag_image = intern_string(drag_image)
+        self.drop_image = intern_string(drop_image)
 
 """
     Class Graph contains the nodes and has functions to go through them
     
     Attributes:
         nodes (list): List of nodes
+        nodes_by_name (dict): Index of the nodes by their name
+        nodes_by_image (dict): Index of the nodes by their normalized image path
         startNode (Node): root node or main node
 """
 class Graph:
     def __init__(self):
         self.nodes = set()
+        self.nodes_by_name = {}
+        self.nodes_by_image = {}
         self.startNode = None
 
     """
@@ -127,12 +195,12 @@ class Graph:
     """
     def add_node(self, name):
         # Search for existing node with the same name
-        for node in self.nodes:
-            if node.name == name:
-                print("[INFO] Node with name '" + name + "' already exists.")
-                return node  
+        node = self.nodes_by_name.get(name)
+        if node is not None:
+            print("[INFO] Node with name '" + name + "' already exists.")
+            return node
         n = Node(name)
-        self.nodes.add(n)
+        self._register_node(n)
         return n
     
     """
@@ -141,14 +209,35 @@ class Graph:
     """
     def add_node_with_image(self, name, image_path):
         print("[INFO] Adding node with image: " + image_path)
-        for node in self.nodes:
-            if node.name == name:
-                print("[INFO] Node with name '" + name + "' already exists.")
-                return node  
+        node = self.nodes_by_name.get(name)
+        if node is not None:
+            print("[INFO] Node with name '" + name + "' already exists.")
+            return node
         n = Node(name)
+        self._register_node(n)
         n.set_image(image_path)
-        self.nodes.add(n)
-        return n        
+        return n
+
+    """
+        Adds the node to the graph and to the name and image indexes
+    """
+    def _register_node(self, node):
+        self.nodes.add(node)
+        self.nodes_by_name[node.name] = node
+        node.graph = self
+        if node.image is not None:
+            self.nodes_by_image[normalize_image_path(node.image)] = node
+
+    """
+        Moves the node to its new image in the image index.
+        Called by Node.set_image when the image of a node of this graph changes.
+    """
+    def update_node_image_index(self, node, old_image):
+        old_key = normalize_image_path(old_image)
+        if old_key is not None and self.nodes_by_image.get(old_key) is node:
+            del self.nodes_by_image[old_key]
+        if node.image is not None:
+            self.nodes_by_image[normalize_image_path(node.image)] = node
     
     """
         Removes the node from the graph and removes all transitions pointing to it
@@ -160,9 +249,26 @@ class Graph:
             return False
 
         self.nodes.remove(node)
+        if self.nodes_by_name.get(node.name) is node:
+            del self.nodes_by_name[node.name]
+        image_key = normalize_image_path(node.image)
+        if image_key is not None and self.nodes_by_image.get(image_key) is node:
+            del self.nodes_by_image[image_key]
+        node.graph = None
 
-        for other_node in self.nodes:
-            other_node.transitions = [t for t in other_node.transitions if t.destination is not node]
+        # Only the predecessors of the node hold transitions pointing to it
+        for other_node in node.get_predecessors():
+            if other_node is node:
+                continue
+            other_node.transitions[:] = [t for t in other_node.transitions if t.destination is not node]
+        for t in node.incoming:
+            if t.origin is not node:
+                t.origin = None
+        node.incoming = set(t for t in node.incoming if t.origin is node)
+        # The destinations of the removed node stop having it as predecessor
+        for t in node.transitions:
+            if t.destination is not node:
+                t.destination.incoming.discard(t)
 
         print("[INFO] Node '" + node.name + "' has been removed.")
         return True
@@ -187,9 +293,9 @@ class Graph:
         Returns the node with the given name.
     """
     def get_node(self, name):
-        for node in self.nodes:
-            if node.name == name:
-                return node
+        node = self.nodes_by_name.get(name)
+        if node is not None:
+            return node
         print("[ERROR] Node not found: " + str(name))
         return None
 
@@ -203,9 +309,9 @@ class Graph:
         if image is None:
             print("[ERROR] Image argument is None.")
             return None
-        for node in self.nodes:
-            if node.image == image:
-                return node
+        node = self.nodes_by_image.get(normalize_image_path(image))
+        if node is not None:
+            return node
         print("[ERROR] Node not found: " + str(image))
         return None
 
@@ -232,7 +338,14 @@ class Graph:
         if node not in self.nodes:
             print("[ERROR] Node '" + node.name + "' is not in the graph.")
             return False
+        existing = self.nodes_by_name.get(new_name)
+        if existing is not None and existing is not node:
+            print("[ERROR] Node with name '" + new_name + "' already exists.")
+            return False
+        if self.nodes_by_name.get(node.name) is node:
+            del self.nodes_by_name[node.name]
         node.update_name(new_name)
+        self.nodes_by_name[new_name] = node
         print("[INFO] Node name updated to '" + new_name + "'.")
         return True
 
@@ -240,7 +353,11 @@ class Graph:
         Clears the graph by removing all nodes and transitions.
     """
     def clear(self):
+        for node in self.nodes:
+            node.graph = None
         self.nodes.clear()
+        self.nodes_by_name.clear()
+        self.nodes_by_image.clear()
         self.startNode = None
         print("[INFO] Graph cleared.")
     
@@ -248,19 +365,7 @@ class Graph:
         Check if a node is in the graph.
     """
     def is_node_in_graph(self, name):
-        print("[INFO] Graph nodes: ", self.nodes)
-        for node in self.nodes:
-            if node.name == name:
-                #print("[INFO] Node '" + node.name + "' is in the graph.")
-                return True
-        #print("[ERROR] Node '" + name + "' is not in the graph.")
-        return False
+        return name in self.nodes_by_name
 
     def is_node_in_graph_image(self, image):
-        print("[INFO] Graph nodes: ", self.nodes)
-        for node in self.nodes:
-            if node.image is image:
-                #print("[INFO] Node '" + node.name + "' is in the graph.")
-                return True
-        #print("[ERROR] Node '" + name + "' is not in the graph.")
-        return False
\ No newline at end of file
+        return normalize_image_path(image) in self.nodes_by_image
\ No newline at end of file
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import os
+from collections import namedtuple
+from actionTypes import ActionType
+
+CatalogState = namedtuple("CatalogState", "name folder image buttons")
+CatalogButton = namedtuple("CatalogButton", "action image text drag_image drop_image")
+
+"""
+    Class ImageCatalog lists the states of an images directory once and keeps them
+    until refresh finds that the directory tree changed.
+    Each state folder has a main image (its first image file) and a buttons folder
+    with one folder per action type. Click and type buttons have their text read from
+    the .txt file next to the image and drag and drop buttons are listed once per
+    dragN/dropN pair.
+
+    Attributes:
+        images_dir (str): Directory with one folder per state
+        buttons_dir (str): Name of the buttons folder inside each state folder
+        valid_extensions (set): Extensions of the image files
+"""
+class ImageCatalog:
+    def __init__(self, images_dir, buttons_dir, valid_extensions):
+        self.images_dir = images_dir
+        self.buttons_dir = buttons_dir
+        self.valid_extensions = valid_extensions
+        self._states = None
+        self._states_by_name = {}
+        self._directory_mtimes = []
+
+    """
+        Lists the images directory again if it changed since the last listing.
+        States are only checked here, so callers decide how often the directories are checked.
+    """
+    def refresh(self):
+        if self._states is None or self._is_stale():
+            self._build()
+
+    """
+        Returns the states of the last listing, listing the images directory if it was never listed or invalidated
+    """
+    def states(self):
+        if self._states is None:
+            self._build()
+        return self._states
+
+    """
+        Returns the state with the given folder name, None if it does not exist
+    """
+    def get_state(self, name):
+        self.states()
+        return self._states_by_name.get(name)
+
+    """
+        Forces the images directory to be listed again on the next access
+    """
+    def invalidate(self):
+        self._states = None
+
+    def _is_stale(self):
+        for directory, mtime in self._directory_mtimes:
+            try:
+                if os.path.getmtime(directory) != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _build(self):
+        print("[INFO] Listing states in: " + str(self.images_dir))
+        self._states = []
+        self._states_by_name = {}
+        self._directory_mtimes = []
+        self._watch(self.images_dir)
+        for name in os.listdir(self.images_dir):
+            folder = os.path.join(self.images_dir, name)
+            # It must be a directory
+            if not os.path.isdir(folder):
+                continue
+            self._watch(folder)
+            images = self._image_files(folder)
+            if not images:
+                continue
+            # The first image is the main state image
+            state = CatalogState(name, folder, os.path.join(folder, images[0]), self._list_buttons(folder))
+            self._states.append(state)
+            self._states_by_name[name] = state
+
+    def _list_buttons(self, folder):
+        buttons = []
+        buttons_path = os.path.join(folder, self.buttons_dir)
+        if not os.path.isdir(buttons_path):
+            return buttons
+        self._watch(buttons_path)
+        for name, action_type in vars(ActionType).items():
+            if not isinstance(action_type, str) or not name.isupper() or not ActionType.is_valid_action(action_type):
+                continue
+            action_type_path = os.path.join(buttons_path, action_type.lower())
+            if not os.path.isdir(action_type_path):
+                continue
+            self._watch(action_type_path)
+            images = self._image_files(action_type_path)
+            pairs = set()
+            for image in images:
+                image_path = os.path.join(action_type_path, image)
+                if action_type == ActionType.CLICK_AND_TYPE:
+                    buttons.append(CatalogButton(action_type, image_path, self._read_text(image_path), None, None))
+                elif action_type == ActionType.DRAG_AND_DROP:
+                    pair = self._drag_and_drop_pair(image, images)
+                    if pair is None:
+                        print("[WARNING] No drag and drop pair for: " + str(image_path))
+                        continue
+                    if pair in pairs:
+                        continue
+                    pairs.add(pair)
+                    buttons.append(CatalogButton(action_type, image_path, None,
+                                                 os.path.join(action_type_path, pair[0]), os.path.join(action_type_path, pair[1])))
+                else:
+                    buttons.append(CatalogButton(action_type, image_path, None, None, None))
+        return buttons
+
+    def _image_files(self, folder):
+        return [f for f in os.listdir(folder)
+                if os.path.splitext(f)[1].lower() in self.valid_extensions and os.path.isfile(os.path.join(folder, f))]
+
+    def _watch(self, directory):
+        self._directory_mtimes.append((directory, os.path.getmtime(directory)))
+
+    """
+        Returns the (drag image, drop image) file names of a dragN/dropN image, None if the pair is incomplete
+    """
+    def _drag_and_drop_pair(self, image, images):
+        name, ext = os.path.splitext(image)
+        for prefix in ("drag", "drop"):
+            if name.startswith(prefix) and name[len(prefix):].isdigit():
+                num = name[len(prefix):]
+                pair = ("drag" + num + ext, "drop" + num + ext)
+                if pair[0] in images and pair[1] in images:
+                    return pair
+        return None
+
+    def _read_text(self, image_path):
+        txt_path = os.path.splitext(image_path)[0] + ".txt"
+        if not os.path.isfile(txt_path):
+            return None
+        with open(txt_path, "r") as f:
+            return f.read().strip()
@@ -37,7 +37,6 @@ class Interface(App, ctk.CTk):
         # ------Parameters.
         self.test_checkboxes = {}
         self.test_output_widgets = {} 
-        self.jython_process = None # Jython process
         
         ctk.CTk.__init__(self)
         App.__init__(self=self,
@@ -183,6 +182,15 @@ class Interface(App, ctk.CTk):
             ]
         return selected_test_classes      
 
+    """
+        Show the progress of the graph generation in the terminal tab when a node or a transition is found.
+        Events arrive from the Jython reader thread, so the output is scheduled on the Tk main loop.
+    """
+    def on_exploration_event(self, event):
+        if event.get("event") in ("node", "transition") and not self.stop_event.is_set():
+            summary = "[PROGRESS] " + self.get_progress_summary()
+            self.after(0, lambda: print(summary))
+
     """
         Restore the original stdout when the application is closed
     """
@@ -196,10 +204,9 @@ class Interface(App, ctk.CTk):
             except Exception as e:
                 print(f"[WARNING] Failed to cancel event {after_id}: {e}")
 
-        if hasattr(self, "jython_process") and self.jython_process is not None:
+        if self.jython_worker is not None:
             print("[INFO] Terminating Jython process...")
-            self.jython_process.terminate()
-            self.jython_process.wait()
+            self.jython_worker.terminate()
             print("[INFO] Jython process terminated.")
 
         threading.Event().wait(0.5)
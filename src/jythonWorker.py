@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import json
+import queue
+import subprocess
+import sys
+import threading
+
+from parallelExplorer import WORKER_RESULT_PREFIX, EVENT_PREFIX
+
+
+class JythonWorker():
+    """
+        Long-lived Jython process running generateGraph.py --serve.
+        The JVM and SikuliX are started once and every request reuses them.
+
+        Args:
+            command (list): Command that starts generateGraph.py in serve mode
+            event_callback (function): Called from the reader thread with each progress event
+    """
+    def __init__(self, command, event_callback=None):
+        self.command = command
+        self.event_callback = event_callback
+        self.process = None
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        self.reader_thread = None
+
+    """
+        Start the Jython process if it is not running and wait until it is ready
+        Returns True if the process is ready
+    """
+    def start(self):
+        if self.is_running():
+            return True
+        print("[INFO] Starting Jython worker: " + " ".join(self.command))
+        self.results = queue.Queue()
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=sys.__stderr__,
+            text=True,
+            bufsize=1
+        )
+        self.reader_thread = threading.Thread(target=self._read_output, args=(self.process,), daemon=True)
+        self.reader_thread.start()
+        ready = self.results.get()
+        if ready.get("error"):
+            print("[ERROR] Jython worker could not start: " + ready["error"])
+            return False
+        return True
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    """
+        Send a request and wait for its result. The output of the request is streamed while it runs.
+
+        Args:
+            command (str): generate, replay or match
+            fields: Other fields of the request, such as options, path or images
+        Returns the result of the request as a dict, with an error key if it failed
+    """
+    def request(self, command, **fields):
+        with self.lock:
+            if not self.start():
+                return {"error": "Jython worker not running"}
+            message = dict(fields)
+            message["command"] = command
+            try:
+                self.process.stdin.write(json.dumps(message) + "\n")
+                self.process.stdin.flush()
+            except OSError as e:
+                return {"error": "Could not send the request: " + str(e)}
+            return self.results.get()
+
+    """
+        Ask the Jython process to exit, terminating it if it does not
+    """
+    def stop(self, timeout=5):
+        with self.lock:
+            if not self.is_running():
+                return
+            try:
+                self.process.stdin.write(json.dumps({"command": "exit"}) + "\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.terminate()
+                self.process.wait()
+            self.process = None
+
+    """
+        Kill the Jython process without waiting for the running request to end
+    """
+    def terminate(self):
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.terminate()
+            process.wait()
+
+    def _read_output(self, process):
+        for line in process.stdout:
+            if line.startswith(WORKER_RESULT_PREFIX):
+                self.results.put(json.loads(line[len(WORKER_RESULT_PREFIX):]))
+            elif line.startswith(EVENT_PREFIX):
+                if self.event_callback is not None:
+                    self.event_callback(json.loads(line[len(EVENT_PREFIX):]))
+            else:
+                sys.__stdout__.write(line)
+                sys.__stdout__.flush()
+        self.results.put({"error": "Jython worker exited with code " + str(process.wait())})
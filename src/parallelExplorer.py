@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from graphsDef import Graph
+from graphIO import GraphIO
+
+WORKER_RESULT_PREFIX = "@@RESULT "
+EVENT_PREFIX = "@@EVENT "
+XVFB_SCREEN = "1920x1080x24"
+XVFB_STARTUP_DELAY = 2
+
+"""
+    Class ParallelExplorer explores the states of an executable with several workers at once.
+    Each worker is a GenerateGraph process in worker mode with its own copy of the executable,
+    running on its own Xvfb display so that screenshots and input of different workers never mix.
+    Workers are separate processes because SikuliX binds its Screen to the display of its JVM.
+
+    The explorer keeps a shared frontier of tasks. A task is the path of actions that leads from
+    the start state to a known state plus the action to try there. The worker replays the path,
+    performs the action and reports the state it reached and the buttons of that state.
+    Every result is merged into one graph and the buttons of new states are added to the frontier.
+
+    Attributes:
+        workers (int): Number of workers
+        worker_command (list): Command that launches a worker, without the worker arguments
+        images_dir (str): Directory with the state images
+        practical_graph_file (str): Output graph file
+        first_display (int): Number of the Xvfb display of the first worker
+"""
+class ParallelExplorer:
+    def __init__(self, workers, worker_command, images_dir, practical_graph_file, first_display=99):
+        self.graph_io = GraphIO()
+
+        self.workers = workers
+        self.worker_command = worker_command
+        self.images_dir = images_dir
+        self.practical_graph_file = practical_graph_file
+        self.first_display = first_display
+        self.default_state_name = "State_"
+
+        self.graph = None
+        self.frontier = deque()
+        self.pending_tasks = 0
+        self.condition = threading.Condition()
+        self.explored_states = set()
+        self.phantom_state_counter = 0
+        self.xvfb_processes = []
+        self.start_explored = False
+
+    """
+        Explores the executable with all the workers and writes the graph.
+        Returns True if the graph was written, False if it could not be written
+        and None if the workers could not explore it (no display, no worker alive,
+        or tasks left when every worker had exited).
+    """
+    def generate_graph(self):
+        displays = self._start_displays()
+        if displays is None:
+            return None
+
+        self.graph = Graph()
+        self.frontier.append({"origin": None, "path": [], "action": None, "button": None})
+        threads = []
+        for worker_id, display in enumerate(displays):
+            thread = threading.Thread(target=self._worker_loop, args=(worker_id, display))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            self._stop_displays()
+
+        if not self.start_explored or self.frontier:
+            print("[ERROR] Every worker exited before the exploration was complete")
+            return None
+        print("[PARALLEL] Exploration finished with " + str(len(self.graph.nodes)) + " states")
+        return self.graph_io.write_graph(self.images_dir, self.practical_graph_file, self.graph)
+
+    def _start_displays(self):
+        displays = []
+        for worker_id in range(self.workers):
+            display = ":" + str(self.first_display + worker_id)
+            try:
+                self.xvfb_processes.append(subprocess.Popen(["Xvfb", display, "-screen", "0", XVFB_SCREEN]))
+            except OSError as e:
+                print("[ERROR] Could not start Xvfb on display " + display + ": " + str(e))
+                self._stop_displays()
+                return None
+            displays.append(display)
+        # Give the X servers time to accept connections
+        time.sleep(XVFB_STARTUP_DELAY)
+        for process in self.xvfb_processes:
+            if process.poll() is not None:
+                print("[ERROR] Xvfb exited with code " + str(process.returncode))
+                self._stop_displays()
+                return None
+        return displays
+
+    def _stop_displays(self):
+        for process in self.xvfb_processes:
+            if process.poll() is None:
+                process.terminate()
+                process.wait()
+        self.xvfb_processes = []
+
+    def _worker_loop(self, worker_id, display):
+        env = dict(os.environ)
+        env["DISPLAY"] = display
+        command = self.worker_command + ["--worker", "--worker_id", str(worker_id)]
+        print("[PARALLEL] Starting worker " + str(worker_id) + " on display " + display)
+        try:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env, universal_newlines=True)
+        except OSError as e:
+            print("[ERROR] Could not start worker " + str(worker_id) + ": " + str(e))
+            return
+
+        try:
+            while True:
+                task = self._next_task()
+                if task is None:
+                    break
+                result = self._send_task(process, worker_id, task)
+                if result.get("worker_exited"):
+                    # Another worker must take the task
+                    print("[ERROR] Worker " + str(worker_id) + " exited: " + result["error"])
+                    self._requeue_task(task)
+                    break
+                self._merge_result(task, result)
+        finally:
+            try:
+                process.stdin.write(json.dumps({"command": "exit"}) + "\n")
+                process.stdin.flush()
+            except (IOError, OSError):
+                pass
+            process.wait()
+            print("[PARALLEL] Worker " + str(worker_id) + " finished")
+
+    """
+        Takes the next task of the frontier. Waits while the frontier is empty but other
+        workers may still add tasks to it. Returns None when the exploration is over.
+    """
+    def _next_task(self):
+        with self.condition:
+            while not self.frontier and self.pending_tasks > 0:
+                self.condition.wait()
+            if not self.frontier:
+                return None
+            self.pending_tasks += 1
+            return self.frontier.popleft()
+
+    def _requeue_task(self, task):
+        with self.condition:
+            self.frontier.appendleft(task)
+            self.pending_tasks -= 1
+            self.condition.notify_all()
+
+    def _send_task(self, process, worker_id, task):
+        message = {"path": task["path"], "action": task["action"], "button": task["button"]}
+        try:
+            process.stdin.write(json.dumps(message) + "\n")
+            process.stdin.flush()
+        except (IOError, OSError) as e:
+            return {"error": "Could not send the task: " + str(e), "worker_exited": True}
+
+        while True:
+            line = process.stdout.readline()
+            if not line:
+                return {"error": "Worker " + str(worker_id) + " closed its output", "worker_exited": True}
+            if line.startswith(WORKER_RESULT_PREFIX):
+                return json.loads(line[len(WORKER_RESULT_PREFIX):])
+            print("[WORKER " + str(worker_id) + "] " + line.rstrip())
+
+    def _merge_result(self, task, result):
+        with self.condition:
+            try:
+                if result.get("error"):
+                    print("[ERROR] Task " + str(task["action"]) + " " + str(task["button"]) + " failed: " + result["error"])
+                    return
+
+                if result.get("state") is None:
+                    # Unknown state, same as the phantom states of the sequential exploration
+                    node = self.graph.add_node(self.default_state_name + str(self.phantom_state_counter))
+                    self.phantom_state_counter += 1
+                else:
+                    node = self.graph.add_node_with_image(result["state"], result["image"])
+
+                origin = task["origin"]
+                if origin is None:
+                    self.graph.set_start_node(node)
+                    self.start_explored = True
+                else:
+                    t = self.graph.add_transition(origin, node)
+                    t.update_action(task["action"])
+                    t.update_image(task["button"])
+                    t.update_text(result.get("text"))
+                    t.update_drag_and_drop(result.get("drag_image"), result.get("drop_image"))
+                    print("[PARALLEL] " + origin.name + " -> " + node.name + " (" + str(task["action"]) + ")")
+
+                if result.get("state") is not None and node not in self.explored_states:
+                    self.explored_states.add(node)
+                    path = list(task["path"])
+                    if task["action"]:
+                        path.append([task["action"], task["button"]])
+                    for action, btn in result.get("buttons", []):
+                        self.frontier.append({"origin": node, "path": path, "action": action, "button": btn})
+            finally:
+                self.pending_tasks -= 1
+                self.condition.notify_all()
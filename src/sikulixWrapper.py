@@ -1,11 +1,21 @@
 # -*- coding: utf-8 -*-
 import os
+import time
+from collections import OrderedDict
 from org.python.core import PySystemState
 
 py_sys = PySystemState()
 py_sys.path.append("sikulixapi-2.0.5.jar")
 
-from org.sikuli.script import Screen, Pattern, Key, KeyModifier, Region
+from org.sikuli.script import Screen, Pattern, Key, KeyModifier, Region, Finder, Image
+from java.io import File
+from java.util import Arrays
+from javax.imageio import ImageIO
+from templateMatcher import TemplateMatcher, MatchResult
+
+PATTERN_CACHE_SIZE = 128
+MATCH_REGION_PADDING = 50
+MATCH_SCAN_INTERVAL = 0.3
 
 """
 Decorator to turn a class into a Singleton.
@@ -19,16 +29,93 @@ def singleton(cls):
         return instances[cls]
     return get_instance
 
+"""
+    Class SikulixMatcher is the default template matching backend of SikulixWrapper.
+    It captures the screen with SikuliX and scores the images with a SikuliX Finder,
+    using the decoded images cached by the wrapper.
+
+    Attributes:
+        screen (Screen): SikuliX screen to capture
+        pattern (function): Returns the Pattern of an image path with a similarity
+"""
+class SikulixMatcher(TemplateMatcher):
+    def __init__(self, screen, pattern):
+        self.screen = screen
+        self.pattern = pattern
+
+    def capture(self):
+        return self.screen.capture()
+
+    def find(self, screenshot, image_path, similarity, region=None):
+        image = screenshot.getImage()
+        left = 0
+        top = 0
+        if region is not None:
+            region = self.clip_region(region, image.getWidth(), image.getHeight())
+            if region is None:
+                return None
+            left, top, w, h = region
+            image = image.getSubimage(left, top, w, h)
+        finder = Finder(Image(image))
+        try:
+            finder.find(self.pattern(image_path, similarity))
+            if not finder.hasNext():
+                return None
+            match = finder.next()
+            return MatchResult(left + match.getX(), top + match.getY(), match.getW(), match.getH(), match.getScore())
+        finally:
+            finder.destroy()
+
 """
     Wrapper around SikuliX's Screen object, implemented as a Singleton.
     Provides convenient methods to search for and click images,
     as well as to capture screenshots on error.
+    Images are found in captures of the screen by the TemplateMatcher in matcher, a SikulixMatcher.
 """
 @singleton
 class SikulixWrapper:
     def __init__(self):
         self.screen = Screen()
         self.last_match_region = None
+        self.image_cache = OrderedDict()
+        self.match_locations = {}
+        self.match_listener = None
+        self.matcher = SikulixMatcher(self.screen, self._pattern)
+
+    """
+        Sets a function called after every search with the image path, the seconds it took and whether it was found.
+        best_match reports the best image path, None if no image matched.
+        With None, searches are not reported.
+    """
+    def set_match_listener(self, listener):
+        self.match_listener = listener
+
+    """
+        Returns a Pattern of the image with the given similarity.
+        Decoded images are kept in an LRU cache keyed by path and modification time,
+        so each image file is only read again when it changes.
+
+        :param image_path: Path to the image file.
+        :param similarity: Similarity threshold (0.0–1.0).
+        :return: Pattern of the image.
+    """
+    def _pattern(self, image_path, similarity):
+        try:
+            mtime = os.path.getmtime(image_path)
+        except OSError:
+            # Let SikuliX report the missing image
+            return Pattern(image_path).similar(similarity)
+
+        entry = self.image_cache.pop(image_path, None)
+        if entry is None or entry[0] != mtime:
+            buffered_image = ImageIO.read(File(image_path))
+            if buffered_image is None:
+                return Pattern(image_path).similar(similarity)
+            entry = (mtime, Image(buffered_image))
+        self.image_cache[image_path] = entry
+        if len(self.image_cache) > PATTERN_CACHE_SIZE:
+            self.image_cache.popitem(last=False)
+        return Pattern(entry[1]).similar(similarity)
 
     """
     Attempt to locate the given image on screen several times.
@@ -46,7 +133,7 @@ class SikulixWrapper:
             actual_attempt = attempt + 1
             actual_similarity = similarity - (similarity_reduction*attempt)
             print("Attempts " + str(actual_attempt) + "/" + str(retries))
-            match = self.screen.exists(Pattern(image_path).similar(actual_similarity), timeout)
+            match = self._exists(image_path, actual_similarity, timeout)
             if match:
                 self.last_match_region = (match.getX(), match.getY(), match.getW(), match.getH())
                 if capture_last_match:
@@ -68,7 +155,7 @@ class SikulixWrapper:
     """
     def search_image_once(self, image_path, similarity=1.0, timeout=2):
         print("[INFO] Searching for image (once): " + image_path)
-        match = self.screen.exists(Pattern(image_path).similar(similarity), timeout)
+        match = self._exists(image_path, similarity, timeout)
         if match:
             print("[OK] Image found.")
             return True
@@ -76,6 +163,69 @@ class SikulixWrapper:
             print("[WARNING] Not found.")
             return False
 
+    """
+        Search for an image, first around the place where it was last found and then on the whole screen.
+
+        :param image_path: Path to the image file to search for.
+        :param similarity: Similarity threshold (0.0–1.0).
+        :param timeout: How many seconds to keep capturing the screen until the image is found.
+        :return: The screen Region of the match if the image was found; None otherwise.
+    """
+    def _exists(self, image_path, similarity, timeout):
+        start = time.time()
+        match = self._search(image_path, similarity, timeout)
+        if self.match_listener is not None:
+            self.match_listener(image_path, time.time() - start, bool(match))
+        return match
+
+    def _search(self, image_path, similarity, timeout):
+        region = None
+        location = self.match_locations.get(image_path)
+        if location is not None:
+            x, y, w, h = location
+            region = (x - MATCH_REGION_PADDING, y - MATCH_REGION_PADDING, w + 2 * MATCH_REGION_PADDING, h + 2 * MATCH_REGION_PADDING)
+        deadline = time.time() + timeout
+        while True:
+            screenshot = self.matcher.capture()
+            match = None
+            if region is not None:
+                match = self.matcher.find(screenshot, image_path, similarity, region)
+            if match is None:
+                match = self.matcher.find(screenshot, image_path, similarity)
+            if match is not None:
+                self.match_locations[image_path] = (match.x, match.y, match.w, match.h)
+                return self._screen_region(match)
+            if time.time() >= deadline:
+                return None
+            time.sleep(MATCH_SCAN_INTERVAL)
+
+    """
+        Returns the screen Region of a match in a capture of the whole screen
+    """
+    def _screen_region(self, match):
+        return Region(self.screen.getX() + int(match.x), self.screen.getY() + int(match.y), int(match.w), int(match.h))
+
+    """
+        Capture the screen once and score every image against that capture.
+
+        :param image_paths: Paths to the image files to compare with the screen.
+        :param min_similarity: Minimum similarity threshold (0.0–1.0).
+        :return: (image path, score) of the best match above min_similarity; (None, 0) if none matches.
+    """
+    def best_match(self, image_paths, min_similarity=0.7):
+        print("[INFO] Scoring " + str(len(image_paths)) + " images against one screen capture")
+        start = time.time()
+        best_path, match = self.matcher.best_match(self.matcher.capture(), image_paths, min_similarity)
+        if self.match_listener is not None:
+            # The capture and the scoring of every image count as one search
+            self.match_listener(best_path, time.time() - start, best_path is not None)
+        if best_path is None:
+            print("[WARNING] No image matches the screen.")
+            return None, 0
+        self.last_match_region = (self.screen.getX() + match.x, self.screen.getY() + match.y, match.w, match.h)
+        print("[OK] Best match: " + best_path + " (" + str(match.score) + ")")
+        return best_path, match.score
+
     """
         Attempt to locate and click the given image on screen.
 
@@ -92,12 +242,12 @@ class SikulixWrapper:
             actual_attempt = attempt + 1
             actual_similarity = similarity - (similarity_reduction*attempt)
             print("Attempts " + str(actual_attempt) + "/" + str(retries))
-            match = self.screen.exists(Pattern(image_path).similar(actual_similarity), timeout)
+            match = self._exists(image_path, actual_similarity, timeout)
             if match:
                 self.last_match_region = (match.getX(), match.getY(), match.getW(), match.getH())
                 if capture_last_match:
                     self.capture_error(debug_image_name, debug_image_path, capture_last_match)
-                self.screen.click(Pattern(image_path).similar(actual_similarity))
+                self.screen.click(match)
                 print("[OK] Clicked image.")
                 return True
             else:
@@ -121,12 +271,12 @@ class SikulixWrapper:
             actual_attempt = attempt + 1
             actual_similarity = similarity - (similarity_reduction * attempt)
             print("Attempts " + str(actual_attempt) + "/" + str(retries))
-            match = self.screen.exists(Pattern(image_path).similar(actual_similarity), timeout)
+            match = self._exists(image_path, actual_similarity, timeout)
             if match:
                 self.last_match_region = (match.getX(), match.getY(), match.getW(), match.getH())
                 if capture_last_match:
                     self.capture_error(debug_image_name, debug_image_path, capture_last_match)
-                self.screen.doubleClick(Pattern(image_path).similar(actual_similarity))
+                self.screen.doubleClick(match)
                 print("[OK] Double clicked image.")
                 return True
             else:
@@ -150,7 +300,7 @@ class SikulixWrapper:
             actual_similarity = similarity - (similarity_reduction * attempt)
             actual_attempt = attempt + 1
             print("Attempts " + str(actual_attempt) + "/" + str(retries))
-            match = self.screen.exists(Pattern(image_path).similar(actual_similarity), timeout)
+            match = self._exists(image_path, actual_similarity, timeout)
             if match:
                 self.last_match_region = (match.getX(), match.getY(), match.getW(), match.getH())
                 if capture_last_match:
@@ -183,22 +333,73 @@ class SikulixWrapper:
         :param similarity_reduction: Amount to reduce similarity per attempt.
         :return: True if successful, False otherwise.
         """
+        source_match = None
+        target_match = None
         for attempt in range(retries):
             actual_similarity = similarity - (similarity_reduction * attempt)
             actual_attempt = attempt + 1
             print("Attempts " + str(actual_attempt) + "/" + str(retries))
-            source_match = self.screen.exists(Pattern(source_image_path).similar(actual_similarity), timeout)
-            target_match = self.screen.exists(Pattern(target_image_path).similar(actual_similarity), timeout)
+            # Look for both images without waiting, then share the timeout between the missing ones.
+            # An image found in a previous attempt is not searched again.
+            if not source_match:
+                source_match = self._exists(source_image_path, actual_similarity, 0)
+            if not target_match:
+                target_match = self._exists(target_image_path, actual_similarity, 0)
+            missing = [image for image, match in ((source_image_path, source_match), (target_image_path, target_match)) if not match]
+            if missing:
+                wait = float(timeout) / len(missing)
+                if not source_match:
+                    source_match = self._exists(source_image_path, actual_similarity, wait)
+                if not target_match:
+                    target_match = self._exists(target_image_path, actual_similarity, wait)
             if source_match and target_match:
                 self.screen.dragDrop(source_match, target_match)
                 print("[OK] Drag and drop performed.")
                 return True
+            elif not source_match:
+                print("[WARNING] Source image not found. Retrying...")
             else:
-                print("[WARNING] Source or target image not found. Retrying...")
+                print("[WARNING] Target image not found. Retrying...")
 
         print("[FAIL] Failed to perform drag and drop.")    
         return False
 
+    """
+        Returns a checksum of the pixels currently on screen.
+    """
+    def screen_checksum(self):
+        data_buffer = self.screen.capture().getImage().getRaster().getDataBuffer()
+        return Arrays.hashCode(data_buffer.getData())
+
+    """
+        Wait until the screen stops changing: consecutive captures have the same checksum.
+
+        :param timeout: Maximum number of seconds to wait.
+        :param interval: Seconds between captures.
+        :param stable_frames: Number of consecutive equal captures needed.
+        :param changed_from: Checksum of a previous screen. If given, the screen must first differ from it.
+        :return: True if the screen became stable; False if the timeout expired.
+    """
+    def wait_until_stable(self, timeout, interval=0.1, stable_frames=3, changed_from=None):
+        deadline = time.time() + timeout
+        last_checksum = self.screen_checksum()
+        changed = changed_from is None or last_checksum != changed_from
+        equal_frames = 1
+        while time.time() < deadline:
+            time.sleep(interval)
+            checksum = self.screen_checksum()
+            if not changed:
+                changed = checksum != changed_from
+            if checksum == last_checksum:
+                equal_frames += 1
+            else:
+                equal_frames = 1
+                last_checksum = checksum
+            if changed and equal_frames >= stable_frames:
+                return True
+        print("[WARNING] The screen did not become stable in " + str(timeout) + " seconds.")
+        return False
+
     """
         Capture the current screen and save it to a file.
 
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple, OrderedDict
+
+try:
+    import numpy
+except ImportError:
+    # Not available in Jython, where SikuliX does the matching
+    numpy = None
+
+try:
+    from PIL import Image, ImageGrab
+except ImportError:
+    Image = None
+    ImageGrab = None
+
+TEMPLATE_CACHE_SIZE = 128
+PYRAMID_MIN_TEMPLATE_SIZE = 8
+PYRAMID_CANDIDATES = 64
+PYRAMID_COARSE_MARGIN = 0.2
+
+MatchResult = namedtuple("MatchResult", "x y w h score")
+
+"""
+    Class TemplateMatcher is the interface of the template matching backends used by SikulixWrapper.
+    A backend captures the screen and finds image files in a capture.
+    Coordinates of the matches and of the regions are coordinates in the capture.
+    SikulixWrapper uses SikulixMatcher by default, which works in Jython.
+    NumpyTemplateMatcher needs numpy and Pillow, so only CPython code such as the App can use it.
+"""
+class TemplateMatcher:
+    """
+        Method to be implemented by subclasses.
+        Returns a capture of the whole screen
+    """
+    def capture(self):
+        pass
+
+    """
+        Method to be implemented by subclasses.
+        Returns the best MatchResult of the image in the capture with a score of at least similarity, None if there is none.
+        With a region (x, y, w, h) only that part of the capture is searched.
+    """
+    def find(self, screenshot, image_path, similarity, region=None):
+        pass
+
+    """
+        Returns (image path, MatchResult) of the image that best matches the capture with a score of at least min_similarity,
+        (None, None) if none matches
+    """
+    def best_match(self, screenshot, image_paths, min_similarity):
+        best_path = None
+        best = None
+        for image_path in image_paths:
+            match = self.find(screenshot, image_path, min_similarity)
+            if match is not None and (best is None or match.score > best.score):
+                best_path = image_path
+                best = match
+        return best_path, best
+
+    """
+        Returns the region (x, y, w, h) cut to a capture of the given size, None if nothing of it is inside
+    """
+    def clip_region(self, region, width, height):
+        x, y, w, h = region
+        left = max(0, int(x))
+        top = max(0, int(y))
+        right = min(width, int(x + w))
+        bottom = min(height, int(y + h))
+        if right <= left or bottom <= top:
+            return None
+        return left, top, right - left, bottom - top
+
+"""
+    Class NumpyTemplateMatcher matches grayscale templates with normalized cross-correlation,
+    the same score as OpenCV's TM_CCOEFF_NORMED used by SikuliX.
+    The correlation with the template is computed with FFTs and the sums of each window
+    of the capture with integral images, so a whole capture is scored at once.
+    Searches are coarse to fine: the capture and the template are halved pyramid_levels times,
+    every separate peak is found at the lowest resolution and only the area around each one is
+    scored at full resolution. If there are too many peaks or none reaches the similarity the
+    whole capture is scored at full resolution, so the pyramid returns the match of the full search.
+    Templates too small to be halved are searched at full resolution.
+    Requires numpy and Pillow, so it only works in CPython.
+
+    Attributes:
+        pyramid_levels (int): Number of times the capture and the templates are halved, 0 to search at full resolution
+        templates (OrderedDict): LRU cache of the loaded templates by path
+"""
+class NumpyTemplateMatcher(TemplateMatcher):
+    def __init__(self, pyramid_levels=2):
+        if numpy is None or Image is None:
+            raise ImportError("NumpyTemplateMatcher requires numpy and Pillow")
+        self.pyramid_levels = pyramid_levels
+        self.templates = OrderedDict()
+        self._pyramid_screenshot = None
+        self._pyramid = []
+
+    def capture(self):
+        return self.to_array(ImageGrab.grab())
+
+    """
+        Converts a PIL image to a grayscale float array
+    """
+    def to_array(self, image):
+        return numpy.asarray(image.convert("L"), dtype=numpy.float64)
+
+    def find(self, screenshot, image_path, similarity, region=None):
+        template = self._template(image_path)
+        if region is not None:
+            # Regions are small, so they are scored at full resolution
+            region = self.clip_region(region, screenshot.shape[1], screenshot.shape[0])
+            if region is None:
+                return None
+            left, top, w, h = region
+            match = self._find_full(screenshot[top:top + h, left:left + w], template, similarity)
+            if match is None:
+                return None
+            return match._replace(x=left + match.x, y=top + match.y)
+        levels = self._usable_levels(template)
+        if levels > 0:
+            return self._find_coarse_to_fine(screenshot, template, similarity, levels)
+        return self._find_full(screenshot, template, similarity)
+
+    def _find_full(self, screenshot, template, similarity):
+        scores = self.scores(screenshot, template)
+        if scores is None:
+            return None
+        y, x = numpy.unravel_index(numpy.argmax(scores), scores.shape)
+        score = float(scores[y, x])
+        if score < similarity:
+            return None
+        return MatchResult(int(x), int(y), template.shape[1], template.shape[0], score)
+
+    """
+        Returns the score of the template at each position of the screenshot, None if the template does not fit
+    """
+    def scores(self, screenshot, template):
+        image_h, image_w = screenshot.shape
+        h, w = template.shape
+        if h > image_h or w > image_w:
+            return None
+
+        t = template - template.mean()
+        t_norm = numpy.sqrt((t * t).sum())
+
+        # Sum and sum of squares of every h x w window of the screenshot
+        window_sum = self._window_sums(screenshot, h, w)
+        window_sq_sum = self._window_sums(screenshot * screenshot, h, w)
+        window_var = numpy.maximum(window_sq_sum - window_sum * window_sum / (h * w), 0)
+
+        if t_norm == 0:
+            # Flat template: only flat windows of the same brightness match
+            mean_diff = numpy.abs(window_sum / (h * w) - template.mean()) / 255.0
+            return numpy.where(window_var < 1e-6, 1.0 - mean_diff, 0.0)
+
+        # Correlation of the zero-mean template with every window
+        shape = (image_h + h - 1, image_w + w - 1)
+        correlation = numpy.fft.irfft2(numpy.fft.rfft2(screenshot, shape) * numpy.fft.rfft2(t[::-1, ::-1], shape), shape)
+        correlation = correlation[h - 1:image_h, w - 1:image_w]
+
+        denominator = numpy.sqrt(window_var) * t_norm
+        scores = numpy.zeros(correlation.shape)
+        valid = denominator > 1e-6
+        scores[valid] = correlation[valid] / denominator[valid]
+        return scores
+
+    def _find_coarse_to_fine(self, screenshot, template, similarity, levels):
+        coarse_template = self._downscale(template, levels)
+        coarse_scores = self.scores(self._screenshot_level(screenshot, levels), coarse_template)
+        if coarse_scores is None:
+            return None
+        # Downscaling blurs the template, so the coarse scores are compared with a lower threshold
+        candidates = self._peaks(coarse_scores, similarity - PYRAMID_COARSE_MARGIN, coarse_template.shape)
+        if len(candidates) > PYRAMID_CANDIDATES:
+            # Too many look-alikes to refine one by one
+            return self._find_full(screenshot, template, similarity)
+
+        scale = 2 ** levels
+        image_h, image_w = screenshot.shape
+        h, w = template.shape
+        best = None
+        for coarse_y, coarse_x in candidates:
+            # Score the area around the candidate at full resolution
+            top = max(0, (coarse_y - 1) * scale)
+            left = max(0, (coarse_x - 1) * scale)
+            bottom = min(image_h, (coarse_y + 2) * scale + h)
+            right = min(image_w, (coarse_x + 2) * scale + w)
+            scores = self.scores(screenshot[top:bottom, left:right], template)
+            if scores is None:
+                continue
+            y, x = numpy.unravel_index(numpy.argmax(scores), scores.shape)
+            score = float(scores[y, x])
+            if best is None or score > best.score:
+                best = MatchResult(int(left + x), int(top + y), w, h, score)
+        if best is None or best.score < similarity:
+            return self._find_full(screenshot, template, similarity)
+        return best
+
+    """
+        Returns the positions with a score of at least threshold, best first, stopping after PYRAMID_CANDIDATES + 1.
+        Positions closer than the template size to a better one belong to the same peak and are skipped.
+    """
+    def _peaks(self, scores, threshold, template_shape):
+        h, w = template_shape
+        ys, xs = numpy.nonzero(scores >= threshold)
+        peaks = []
+        for i in numpy.argsort(-scores[ys, xs], kind="stable"):
+            y, x = int(ys[i]), int(xs[i])
+            if any(abs(y - peak_y) < h and abs(x - peak_x) < w for peak_y, peak_x in peaks):
+                continue
+            peaks.append((y, x))
+            if len(peaks) > PYRAMID_CANDIDATES:
+                break
+        return peaks
+
+    def _usable_levels(self, template):
+        levels = 0
+        size = min(template.shape)
+        while levels < self.pyramid_levels and size // 2 >= PYRAMID_MIN_TEMPLATE_SIZE:
+            size //= 2
+            levels += 1
+        return levels
+
+    """
+        Returns the capture halved levels times. The pyramid of the last capture is kept,
+        so scoring many templates against one capture only builds it once.
+    """
+    def _screenshot_level(self, screenshot, levels):
+        if self._pyramid_screenshot is not screenshot:
+            self._pyramid_screenshot = screenshot
+            self._pyramid = [screenshot]
+        while len(self._pyramid) <= levels:
+            self._pyramid.append(self._downscale(self._pyramid[-1], 1))
+        return self._pyramid[levels]
+
+    def _downscale(self, image, levels):
+        for _ in range(levels):
+            h = image.shape[0] // 2 * 2
+            w = image.shape[1] // 2 * 2
+            image = image[:h, :w]
+            image = (image[0::2, 0::2] + image[1::2, 0::2] + image[0::2, 1::2] + image[1::2, 1::2]) / 4.0
+        return image
+
+    def _window_sums(self, image, h, w):
+        integral = numpy.zeros((image.shape[0] + 1, image.shape[1] + 1))
+        integral[1:, 1:] = image.cumsum(axis=0).cumsum(axis=1)
+        return integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]
+
+    def _template(self, image_path):
+        template = self.templates.pop(image_path, None)
+        if template is None:
+            template = self.to_array(Image.open(image_path))
+        self.templates[image_path] = template
+        if len(self.templates) > TEMPLATE_CACHE_SIZE:
+            self.templates.popitem(last=False)
+        return template
@@ -96,7 +96,7 @@ class StatesTab(Tabs):
     def save_graph_to_file(self):
         file_path = filedialog.asksaveasfilename(
             defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+            filetypes=[("Text files", "*.txt"), ("Binary graph files", "*.uigraph"), ("All files", "*.*")],
             title="Save graph to file"
         )
         if file_path:
@@ -105,7 +105,7 @@ class StatesTab(Tabs):
     def load_graph_from_dialog(self):
         file_path = filedialog.askopenfilename(
             defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+            filetypes=[("Text files", "*.txt"), ("Binary graph files", "*.uigraph"), ("All files", "*.*")],
             title="Load graph from file"
         )
         if file_path:
@@ -399,11 +399,11 @@ class StatesTab(Tabs):
         If the selected node already has a transition to the current node, it does not add it again
     """
     def add_connection_to_node(self, node, selected_name):
-        for n in self.app.graph.nodes:
-            if n.name == selected_name:
-                new_transition = Transition(n)
-                node.add_transition(new_transition)
-                break
+        n = self.app.graph.get_node(selected_name)
+        if n is None:
+            return
+        new_transition = Transition(n)
+        node.add_transition(new_transition)
 
         self.update_transitions_list(node)
 
@@ -516,7 +516,7 @@ class StatesTab(Tabs):
             return
 
         if node.transitions:
-            node.transitions.pop()
+            node.pop_transition()
             self.update_transitions_list(node)
 
             if not node.transitions:
@@ -533,7 +533,7 @@ class StatesTab(Tabs):
             filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.bmp"), ("All Files", "*.*")]
         )
         if file_path:
-            node.image = file_path
+            node.set_image(file_path)
             print(f"[INFO] Selected image for node {node.name}: {file_path}")
             node.image_label.configure(text=f"Image: {os.path.basename(file_path)}")
 
@@ -549,6 +549,11 @@ class StatesTab(Tabs):
             print("[INFO] No states selected for removal")
             return
 
+        # Only the predecessors of the removed nodes need their transitions list refreshed
+        affected_nodes = set()
+        for node in nodes_to_remove:
+            affected_nodes.update(node.get_predecessors())
+
         for node in nodes_to_remove:
             self.app.graph.remove_node(node)
             print(f"[INFO] Removed node: {node.name}")
@@ -562,8 +567,9 @@ class StatesTab(Tabs):
         self.node_frames = [(frame, edit_frame) for frame, edit_frame in self.node_frames if frame.winfo_exists()]
         self.selected_nodes = [node for node in self.selected_nodes if node not in nodes_to_remove]
 
-        for node in self.app.graph.nodes:
-            node.transitions = [t for t in node.transitions if t.destination not in nodes_to_remove]
+        for node in affected_nodes:
+            if node not in self.app.graph.nodes:
+                continue
             self.update_transitions_list(node)
 
             if not node.transitions:
@@ -1,65 +1,74 @@
 from test import Test
 
 class PrimePathCovTest(Test):
-    def __init__(self, graph=None, graph_file=None):
+    def __init__(self, graph=None, graph_file=None, max_paths=100000):
         super().__init__("PPC Test", graph, graph_file)
         self.prime_paths = set()
+        self.max_paths = max_paths
 
     """
         Overrides the parent run method
+        Computes the prime paths extending the simple paths one node at a time.
+        A path that can not be extended (it closes a cycle or every successor is already in it)
+        is a candidate, and a candidate is prime unless it is the end of a longer candidate.
+        Stops after max_paths paths so huge graphs can not exhaust the memory.
     """
     def run(self):
         print("[INFO] Running " + self.name + ".")
-        all_paths = []
+        self.prime_paths = set()
 
-        # Get all the paths
-        for node in self.graph.nodes:
-            self.dfs(node, set(), [], all_paths) # POR QUE?
-        
-        # Filter and keep the prime paths only
-        for referencePath in all_paths:
-            prime = True
+        # Nodes as integer ids
+        nodes = list(self.graph.nodes)
+        node_ids = {node: i for i, node in enumerate(nodes)}
+        successors = [list(dict.fromkeys(node_ids[t.destination] for t in node.transitions if t.destination in node_ids)) for node in nodes]
 
-            for otherPath in all_paths:
-                if referencePath != otherPath:
-                    if self.is_subpath(referencePath, otherPath):
-                        prime = False
+        candidates = []
+        paths = [(i,) for i in range(len(nodes))]
+        generated = len(paths)
+        truncated = False
+        while paths and not truncated:
+            next_paths = []
+            for path in paths:
+                extended = False
+                for next_node in successors[path[-1]]:
+                    if next_node == path[0]:
+                        # Closes a simple cycle, which can not be extended
+                        candidates.append(path + (next_node,))
+                        extended = True
+                    elif next_node not in path:
+                        next_paths.append(path + (next_node,))
+                        extended = True
+                    else:
+                        continue
+                    generated += 1
+                    if generated > self.max_paths:
+                        truncated = True
                         break
-            if prime:
-                self.prime_paths.add(tuple(referencePath))
-
-        content = "\n".join(" → ".join(node.name for node in path) for path in self.prime_paths)
-        self.notify_update("prime_paths", content)
-        
-    # DFS method to get all the paths.
-    def dfs(self, current, visited, path, all_paths):
-        visited.add(current)
-        path.append(current)
+                if not extended:
+                    candidates.append(path)
+                if truncated:
+                    break
+            paths = next_paths
 
-        for transition in current.transitions:
-            next_node = transition.destination
-            if next_node not in visited:
-                self.dfs(next_node, visited.copy(), path.copy(), all_paths)
-            elif next_node == path[0]:
-                all_paths.append(path + [next_node])
+        if truncated:
+            print("[WARNING] " + self.name + " stopped after " + str(self.max_paths) + " paths, the prime paths are incomplete.")
 
-        all_paths.append(path)
+        # A candidate can only be inside a longer candidate as its end, so the reversed
+        # candidates are kept in a trie and a candidate is prime if its reverse is a leaf
+        trie = {}
+        for path in candidates:
+            level = trie
+            for node_id in reversed(path):
+                level = level.setdefault(node_id, {})
+        for path in candidates:
+            level = trie
+            for node_id in reversed(path):
+                level = level[node_id]
+            if not level:
+                self.prime_paths.add(tuple(nodes[node_id] for node_id in path))
 
-    # Checks if the possibleSubPath is a sub-path of the referencePath.
-    def is_subpath(self, posibleSubPath, referencePath):
-        # If the possible is bigger than the reference then it is not a sub-path.
-        if len(posibleSubPath) > len(referencePath):
-            return False
-        # Checks if the nodes in reference are in the posible.
-        for i in range(len(referencePath) - len(posibleSubPath) + 1):
-            match = True
-            for j in range(len(posibleSubPath)):
-                if referencePath[i + j] != posibleSubPath[j]:
-                    match = False
-                    break
-            if match:
-                return True
-        return False
+        content = "\n".join(" → ".join(node.name for node in path) for path in self.prime_paths)
+        self.notify_update("prime_paths", content)
 
     """
         Overrides the parent write_solution method